@@ -27,8 +27,11 @@ class AIPlayer(Player):
         num_archers,
         occupied,
         num_cannons=3,
+        swarm_options=None,
     ):
         super().__init__()
+        # Extra keyword arguments forwarded to every swarm constructor
+        swarm_options = swarm_options or {}
         self.width = width
         self.height = height
         self.swarm_footmen = SwarmFootmen(
@@ -39,6 +42,7 @@ class AIPlayer(Player):
             height=height,
             attack_range=ATTACK_RANGE,
             kill_probability=KILL_PROBABILITY,
+            **swarm_options,
         )
         self.swarm_archers = SwarmArchers(
             (0, 255, 255),
@@ -48,6 +52,7 @@ class AIPlayer(Player):
             height=height,
             attack_range=ARCHER_ATTACK_RANGE,
             kill_probability=ARCHER_KILL_PROBABILITY,
+            **swarm_options,
         )
         self.swarm_cannon = SwarmCannon(
             (0, 255, 255),
@@ -56,6 +61,7 @@ class AIPlayer(Player):
             width=width,
             height=height,
             owner=self,
+            **swarm_options,
         )
         self.swarm_footmen.owner = self
         self.swarm_archers.owner = self
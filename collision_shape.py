@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Tuple
+from typing import List, Sequence, Tuple
 
 @dataclass
 class CollisionShape:
@@ -16,3 +16,48 @@ class CollisionShape:
         dy = self.center[1] - other.center[1]
         distance_sq = dx * dx + dy * dy
         return distance_sq <= (self.radius + other.radius) ** 2
+
+    def intersectsSegment(
+        self,
+        start: Tuple[float, float],
+        end: Tuple[float, float],
+        radius: float = 0.0,
+    ) -> bool:
+        """Return ``True`` if a capsule around ``start``-``end`` touches this shape.
+
+        The capsule is the segment swept by a circle of ``radius``; with the
+        default of zero this is a plain segment test.
+        """
+        sx, sy = start
+        dx = end[0] - sx
+        dy = end[1] - sy
+        cx = self.center[0] - sx
+        cy = self.center[1] - sy
+        length_sq = dx * dx + dy * dy
+        t = 0.0
+        if length_sq > 0:
+            t = max(0.0, min(1.0, (cx * dx + cy * dy) / length_sq))
+        px = cx - t * dx
+        py = cy - t * dy
+        return px * px + py * py <= (self.radius + radius) ** 2
+
+
+def sweep_and_prune(shapes: Sequence[CollisionShape]) -> List[Tuple[int, int]]:
+    """Return index pairs ``(i, j)`` with ``i < j`` of shapes overlapping on x.
+
+    Shapes are swept by the left edge of their bounding interval; only pairs
+    whose x intervals overlap are reported, in ascending order, so callers
+    only run the exact circle test on these candidates.
+    """
+    order = sorted(range(len(shapes)), key=lambda k: shapes[k].center[0] - shapes[k].radius)
+    pairs = []
+    active = []
+    for k in order:
+        shape = shapes[k]
+        left = shape.center[0] - shape.radius
+        active = [a for a in active if shapes[a].center[0] + shapes[a].radius >= left]
+        for a in active:
+            pairs.append((a, k) if a < k else (k, a))
+        active.append(k)
+    pairs.sort()
+    return pairs
@@ -1,11 +1,19 @@
 from stage import Stage
 from player import Player
 from collision_shape import CollisionShape
+import hashlib
+import itertools
 import random
 import math
+import numpy as np
 import pygame
 
 
+# Versions are drawn from one counter so that no two obstacle layouts, even
+# of different ``Destructibles`` instances, ever share a version number.
+_versions = itertools.count(1)
+
+
 class Tree(Stage):
     """Static destructible object with hit points."""
 
@@ -55,7 +63,28 @@ class Tree(Stage):
 
 
 class Destructibles(Player):
-    """Player controlling stationary destructible trees."""
+    """Player controlling stationary destructible trees.
+
+    Trees are indexed in a grid of ``INDEX_CELL`` pixel cells, updated only
+    when a tree is added or removed, so that :meth:`blocks` tests a position
+    against the few trees near it instead of every tree on the field.
+
+    ``clearance`` is a signed distance field over ``DISTANCE_CELL`` pixel
+    cells: the distance from each cell center to the nearest tree edge,
+    negative inside trees and capped at ``MAX_CLEARANCE``. Adding or
+    removing a tree only patches the cells within that cap around it.
+    """
+
+    INDEX_CELL = 8
+    # Largest circle radius :meth:`blocks` answers from the index; trees are
+    # indexed this much (plus a pixel of shake) beyond their radius
+    INDEX_RADIUS = 7.0
+
+    DISTANCE_CELL = 4
+    MAX_CLEARANCE = 32.0
+    # Largest gap between the clearance of a point and the value stored for
+    # its cell (half a cell diagonal), plus a pixel for shaking trees
+    CLEARANCE_SLACK = DISTANCE_CELL * math.sqrt(2) / 2 + 1.0
 
     def __init__(self, width, height, num_trees=20, occupied=None):
         super().__init__()
@@ -63,6 +92,25 @@ class Destructibles(Player):
         self.height = height
         self.trees = []
         self._invalidators = []
+        # Replaced whenever a tree is added or removed
+        self.version = next(_versions)
+        self._layout = None
+        # Trees touching each index cell and their number per cell
+        self.index_w = max(1, math.ceil(width / self.INDEX_CELL))
+        self.index_h = max(1, math.ceil(height / self.INDEX_CELL))
+        self._index = [() for _ in range(self.index_w * self.index_h)]
+        self.occupancy = np.zeros((self.index_h, self.index_w), dtype=np.uint16)
+        self.index_version = self.version
+        self._indexed = set()
+        # Signed distance field and the slot of the nearest tree per cell
+        self.distance_w = max(1, math.ceil(width / self.DISTANCE_CELL))
+        self.distance_h = max(1, math.ceil(height / self.DISTANCE_CELL))
+        self.clearance = np.full(
+            (self.distance_h, self.distance_w), self.MAX_CLEARANCE, dtype=np.float32
+        )
+        self._nearest = np.full((self.distance_h, self.distance_w), -1, dtype=np.int32)
+        self._slots = {}
+        self._next_slot = itertools.count()
         occupied = occupied if occupied is not None else set()
 
         for _ in range(num_trees):
@@ -80,19 +128,178 @@ class Destructibles(Player):
 
 
 
+    def layout_hash(self):
+        """Return a hash identifying the positions and sizes of the trees.
+
+        Unlike ``version`` it is the same for equal layouts, e.g. across
+        matches played with the same seed.
+        """
+        if self._layout is None or self._layout[0] != self.version:
+            trees = sorted((tree.base_pos[0], tree.base_pos[1], tree.size) for tree in self.trees)
+            digest = hashlib.sha1(repr(trees).encode("utf-8")).hexdigest()
+            self._layout = (self.version, digest)
+        return self._layout[1]
+
+    def clearance_at(self, x, y):
+        """Return the clearance stored for the cell containing ``(x, y)``."""
+        cx = min(self.distance_w - 1, max(0, int(x // self.DISTANCE_CELL)))
+        cy = min(self.distance_h - 1, max(0, int(y // self.DISTANCE_CELL)))
+        return float(self.clearance[cy, cx])
+
+    def clearance_many(self, points):
+        """Return :meth:`clearance_at` for many points as an array."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        cx = np.clip(points[:, 0] // self.DISTANCE_CELL, 0, self.distance_w - 1).astype(np.intp)
+        cy = np.clip(points[:, 1] // self.DISTANCE_CELL, 0, self.distance_h - 1).astype(np.intp)
+        return self.clearance[cy, cx]
+
+    def blocked_mask(self, cell_size, margin=0.0):
+        """Return the flow field obstacle mask for ``cell_size`` and ``margin``.
+
+        A cell is blocked when a circle of half the cell size around its
+        center touches a tree grown by ``margin``, as in
+        :meth:`FlowField.compute`. The mask is read off ``clearance``, so
+        ``None`` is returned when ``cell_size`` is not ``DISTANCE_CELL`` or
+        the reach exceeds ``MAX_CLEARANCE``.
+        """
+        reach = cell_size / 2 + margin
+        if cell_size != self.DISTANCE_CELL or reach >= self.MAX_CLEARANCE:
+            return None
+        return bytearray((self.clearance <= reach).astype(np.uint8).tobytes())
+
+    def blocks(self, x, y, radius=0.0):
+        """Return True if a circle of ``radius`` at ``(x, y)`` touches a tree."""
+        if self.clearance_at(x, y) > radius + self.CLEARANCE_SLACK:
+            return False
+        if radius > self.INDEX_RADIUS:
+            shape = CollisionShape((x, y), radius)
+            return any(shape.collidesWith(tree.getCollisionShape()) for tree in self.trees)
+        cx = min(self.index_w - 1, max(0, int(x // self.INDEX_CELL)))
+        cy = min(self.index_h - 1, max(0, int(y // self.INDEX_CELL)))
+        for tree in self._index[cy * self.index_w + cx]:
+            tx, ty = tree.getPosition()
+            reach = tree.size + radius
+            if (x - tx) ** 2 + (y - ty) ** 2 <= reach * reach:
+                return True
+        return False
+
+    def blocks_many(self, points, radius=0.0):
+        """Return a boolean array telling which of ``points`` :meth:`blocks`."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if radius > self.INDEX_RADIUS:
+            return np.array([self.blocks(x, y, radius) for x, y in points.tolist()], dtype=bool)
+        cx = np.clip(points[:, 0] // self.INDEX_CELL, 0, self.index_w - 1).astype(np.intp)
+        cy = np.clip(points[:, 1] // self.INDEX_CELL, 0, self.index_h - 1).astype(np.intp)
+        result = np.zeros(len(points), dtype=bool)
+        # Only points near a tree need the exact test
+        near = np.flatnonzero(
+            (self.occupancy[cy, cx] > 0)
+            & (self.clearance_many(points) <= radius + self.CLEARANCE_SLACK)
+        )
+        if len(near):
+            result[near] = [
+                self.blocks(x, y, radius) for x, y in points[near].tolist()
+            ]
+        return result
+
+    def _index_tree(self, tree, add):
+        """Add ``tree`` to or remove it from the cells it may touch."""
+        if add == (tree in self._indexed):
+            return
+        if add:
+            self._indexed.add(tree)
+        else:
+            self._indexed.discard(tree)
+        size = self.INDEX_CELL
+        reach = tree.size + self.INDEX_RADIUS + 1.0
+        bx, by = tree.base_pos
+        x0 = max(0, int((bx - reach) // size))
+        x1 = min(self.index_w - 1, int((bx + reach) // size))
+        y0 = max(0, int((by - reach) // size))
+        y1 = min(self.index_h - 1, int((by + reach) // size))
+        for cy in range(y0, y1 + 1):
+            # Nearest point of the cell to the tree center
+            dy = max(cy * size - by, 0, by - (cy + 1) * size)
+            for cx in range(x0, x1 + 1):
+                dx = max(cx * size - bx, 0, bx - (cx + 1) * size)
+                if dx * dx + dy * dy > reach * reach:
+                    continue
+                index = cy * self.index_w + cx
+                if add:
+                    self._index[index] += (tree,)
+                    self.occupancy[cy, cx] += 1
+                else:
+                    self._index[index] = tuple(t for t in self._index[index] if t is not tree)
+                    self.occupancy[cy, cx] -= 1
+        self.index_version = self.version
+
+    def _distance_window(self, tree):
+        """Return the cell slices within ``MAX_CLEARANCE`` of ``tree``."""
+        size = self.DISTANCE_CELL
+        reach = tree.size + self.MAX_CLEARANCE
+        bx, by = tree.base_pos
+        x0 = max(0, math.ceil((bx - reach) / size - 0.5))
+        x1 = min(self.distance_w, math.floor((bx + reach) / size - 0.5) + 1)
+        y0 = max(0, math.ceil((by - reach) / size - 0.5))
+        y1 = min(self.distance_h, math.floor((by + reach) / size - 0.5) + 1)
+        return slice(y0, max(y0, y1)), slice(x0, max(x0, x1))
+
+    def _stamp_distance(self, tree, window):
+        """Lower the clearance of the cells in ``window`` to reach ``tree``."""
+        rows, cols = window
+        size = self.DISTANCE_CELL
+        bx, by = tree.base_pos
+        dx = np.arange(cols.start, cols.stop) * size + size / 2 - bx
+        dy = np.arange(rows.start, rows.stop) * size + size / 2 - by
+        distance = np.hypot(dx[None, :], dy[:, None]) - tree.size
+        clearance = self.clearance[window]
+        closer = distance < clearance
+        clearance[closer] = distance[closer]
+        self._nearest[window][closer] = self._slots[tree]
+
+    def _update_distances(self, tree, add):
+        """Patch ``clearance`` around ``tree`` after adding or removing it."""
+        if add == (tree in self._slots):
+            return
+        window = self._distance_window(tree)
+        if add:
+            self._slots[tree] = next(self._next_slot)
+            self._stamp_distance(tree, window)
+            return
+        slot = self._slots.pop(tree)
+        lost = self._nearest[window] == slot
+        self.clearance[window][lost] = self.MAX_CLEARANCE
+        self._nearest[window][lost] = -1
+        # Cells that had this tree nearest fall back to the others in reach
+        rows, cols = window
+        for other in self._slots:
+            other_rows, other_cols = self._distance_window(other)
+            overlap = (
+                slice(max(rows.start, other_rows.start), min(rows.stop, other_rows.stop)),
+                slice(max(cols.start, other_cols.start), min(cols.stop, other_cols.stop)),
+            )
+            if overlap[0].start < overlap[0].stop and overlap[1].start < overlap[1].stop:
+                self._stamp_distance(other, overlap)
+
     def register_invalidator(self, func):
         if callable(func):
             self._invalidators.append(func)
 
-    def _notify_invalidator(self):
+    def _notify_invalidator(self, removed=None):
         for cb in self._invalidators:
-            cb()
+            if removed is None:
+                cb()
+            else:
+                cb(removed)
 
     def add_stage(self, child):
         super().add_stage(child)
         if isinstance(child, Tree):
             if child not in self.trees:
                 self.trees.append(child)
+            self.version = next(_versions)
+            self._index_tree(child, True)
+            self._update_distances(child, True)
             self._notify_invalidator()
 
     def remove_stage(self, child):
@@ -100,5 +307,8 @@ class Destructibles(Player):
         if isinstance(child, Tree):
             if child in self.trees:
                 self.trees.remove(child)
-            self._notify_invalidator()
+            self.version = next(_versions)
+            self._index_tree(child, False)
+            self._update_distances(child, False)
+            self._notify_invalidator(child)
 
@@ -32,16 +32,13 @@ class Explosion(Stage):
         if self.age > self.duration:
             if not self._processed:
                 for swarm in self._collisions:
-                    if not swarm.ants:
+                    if len(swarm.ants) == 0:
                         continue
                     removed = []
                     for idx in range(len(swarm.ants)):
                         if random.random() < self.EXPLOSION_KILL_PROBABILITY:
                             removed.append(idx)
-                    for idx in reversed(removed):
-                        swarm.ants.pop(idx)
-                    if removed:
-                        swarm._invalidate_centroid_cache()
+                    swarm.remove_ants(removed)
                 self._processed = True
             parent = getattr(self, "_parent", None)
             if parent is not None:
@@ -1,16 +1,53 @@
-"""Grid based flow field pathfinding without external dependencies."""
+"""Grid based flow field pathfinding.
 
+The ``"bfs"`` and ``"dijkstra"`` engines are pure Python; the ``"numpy"``
+engine rasterizes, propagates and builds the gradient with array operations.
+"""
+
+from array import array
 from collections import deque
 from typing import Iterable, Tuple
+import heapq
 import math
 import time
 from datetime import datetime
 
+import numpy as np
+
 from collision_shape import CollisionShape
 
+SQRT2 = math.sqrt(2)
+
 
 class FlowField:
-    """Compute a flow field towards a goal avoiding obstacles."""
+    """Compute a flow field towards a goal avoiding obstacles.
+
+    ``engine`` selects how costs are propagated from the goal:
+
+    ``"bfs"``
+        FIFO queue that re-enqueues a cell whenever a cheaper cost is found.
+    ``"dijkstra"``
+        Binary heap ordered by cost, so every cell is expanded exactly once.
+    ``"numpy"``
+        Alternating downward and upward row sweeps with in-row scans, repeated
+        until no cost improves. The gradient of every cell is computed at the
+        end of :meth:`compute` instead of lazily.
+
+    After :meth:`compute`, ``relaxations`` holds the number of cost updates
+    and ``expansions`` the number of cells whose neighbours were examined
+    (rows swept for the ``"numpy"`` engine).
+
+    Costs are stored row-major in a flat float32 ``array`` and the gradient
+    as one byte per cell indexing into ``DIRECTIONS`` (``NO_DIRECTION`` for
+    cells without a cheaper neighbour, ``UNKNOWN_DIRECTION`` until a lazy
+    engine fills the cell on first use).
+
+    The pure Python engines pause briefly every few thousand cells so that a
+    worker thread does not starve the game loop of the GIL. Set
+    ``cooperative`` to ``False`` when computing in a separate process.
+    """
+
+    ENGINES = ("bfs", "dijkstra", "numpy")
 
     DIRECTIONS = [
         (-1, 0),
@@ -23,27 +60,88 @@ class FlowField:
         (1, 1),
     ]
 
-    def __init__(self, width: int, height: int, cell_size: int = 1):
+    NO_DIRECTION = 8
+    UNKNOWN_DIRECTION = 255
+
+    # Unit vector for each direction code, ``NO_DIRECTION`` included
+    DIRECTION_VECTORS = [
+        (dx / (dx * dx + dy * dy) ** 0.5, dy / (dx * dx + dy * dy) ** 0.5)
+        for dx, dy in DIRECTIONS
+    ] + [(0.0, 0.0)]
+
+    def __init__(self, width: int, height: int, cell_size: int = 1, engine: str = "bfs"):
+        if engine not in self.ENGINES:
+            raise ValueError("unknown flow field engine: {!r}".format(engine))
+        self.engine = engine
         self.width = width
         self.height = height
         self.cell_size = cell_size
         self.grid_w = max(1, (width + cell_size - 1) // cell_size)
         self.grid_h = max(1, (height + cell_size - 1) // cell_size)
 
-        nan = float("nan")
-        self._vectors = [
-            [[nan, nan] for _ in range(self.grid_w)] for _ in range(self.grid_h)
-        ]
+        cells = self.grid_w * self.grid_h
+        self._directions = bytearray([self.NO_DIRECTION]) * cells
 
         # Cost field initialised to ``inf``
         inf = float("inf")
-        self.costs = [
-            [inf for _ in range(self.grid_w)] for _ in range(self.grid_h)
-        ]
+        self.costs = array("f", [inf]) * cells
         self.INF = inf
 
         self.goal = None
+        self.margin = 0.0
+        # Obstacle mask of the last computation, one byte per cell
+        self.blocked = bytearray(cells)
         self.max_distance = 0.0
+        self.relaxations = 0
+        self.expansions = 0
+        self.cooperative = True
+        # Bounded fields keep their Dijkstra frontier and settled cells so
+        # that they can be extended; ``complete`` is False until then.
+        self.complete = True
+        self._frontier = None
+        self._settled = None
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory used by the cost, direction and obstacle grids."""
+        return (
+            len(self.costs) * self.costs.itemsize
+            + len(self._directions)
+            + len(self.blocked)
+        )
+
+    def write_buffers(self, buffer) -> None:
+        """Copy the costs, directions and obstacle mask into ``buffer``.
+
+        ``buffer`` must be a writable buffer of at least :attr:`nbytes`.
+        """
+        view = memoryview(buffer).cast("B")
+        split = len(self.costs) * self.costs.itemsize
+        cells = len(self._directions)
+        view[:split] = memoryview(self.costs).cast("B")
+        view[split:split + cells] = self._directions
+        view[split + cells:split + 2 * cells] = self.blocked
+
+    def read_buffers(self, buffer) -> None:
+        """Load costs and directions written by :meth:`write_buffers`."""
+        view = memoryview(buffer).cast("B")
+        split = len(self.costs) * self.costs.itemsize
+        self.costs = array("f")
+        self.costs.frombytes(view[:split])
+        cells = len(self._directions)
+        self._directions = bytearray(view[split:split + cells])
+        self.blocked = bytearray(view[split + cells:split + 2 * cells])
+
+    def cell_of(self, pos: Tuple[float, float]) -> Tuple[int, int]:
+        """Return the grid cell containing ``pos``."""
+        return (
+            min(self.grid_w - 1, max(0, int(pos[0] / self.cell_size))),
+            min(self.grid_h - 1, max(0, int(pos[1] / self.cell_size))),
+        )
+
+    def cost_at(self, x: int, y: int) -> float:
+        """Return the cost stored for cell ``(x, y)``."""
+        return self.costs[y * self.grid_w + x]
 
     def _cell_center(self, x: int, y: int) -> Tuple[float, float]:
         return (
@@ -59,90 +157,559 @@ class FlowField:
         goal: Tuple[float, float],
         obstacles: Iterable[CollisionShape],
         margin: float = 0.0,
+        bounds: Tuple[float, float, float, float] = None,
+        blocked: bytearray = None,
     ):
         """Compute the cost field towards ``goal`` avoiding ``obstacles``.
 
         ``margin`` expands the radius of each obstacle by the given amount
-        during computation.
+        during computation. A precomputed obstacle mask for that margin (one
+        byte per cell, row-major) may be passed as ``blocked`` instead of
+        rasterizing ``obstacles``.
+
+        With ``bounds`` given as ``(min_x, min_y, max_x, max_y)`` in pixels
+        the field is bounded: a Dijkstra search (whatever the engine) stops
+        as soon as every cell inside the rectangle is settled. Use
+        :meth:`covers` and :meth:`extend` before sampling outside of it.
         """
         now = datetime.now()
         print(now.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3] + ' field_flow compute - start')
 
         self.goal = goal
+        self.margin = margin
+        self.complete = True
+        self._frontier = None
+        self._settled = None
 
-        blocked = [[False for _ in range(self.grid_w)] for _ in range(self.grid_h)]
-        half = self.cell_size / 2
-        counter = 0
-        for y in range(self.grid_h):
-            if counter % 50 == 0 :
-                time.sleep(0.01)
-            counter += 1
-            for x in range(self.grid_w):
-                center = self._cell_center(x, y)
-                cell_shape = CollisionShape(center, half)
-                for shape in obstacles:
-                    inflated = CollisionShape(shape.center, shape.radius + margin)
-                    if cell_shape.collidesWith(inflated):
-                        blocked[y][x] = True
-                        break
+        if self.engine == "numpy" and bounds is None:
+            self._compute_numpy(goal, obstacles, margin, blocked)
+            return
+
+        if blocked is None:
+            blocked, counter = self._rasterize_obstacles(obstacles, margin)
+        else:
+            blocked, counter = bytearray(blocked), 0
+        self.blocked = blocked
 
         now = datetime.now()
         print(now.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3] + ' field_flow compute - half way (counter: {})'.format(counter))
 
-        costs = [[self.INF for _ in range(self.grid_w)] for _ in range(self.grid_h)]
+        # Propagate in a temporary flat list of floats and keep only the
+        # packed float32 copy once the field is complete.
+        costs = [self.INF] * (self.grid_w * self.grid_h)
         gx = min(self.grid_w - 1, max(0, int(goal[0] / self.cell_size)))
         gy = min(self.grid_h - 1, max(0, int(goal[1] / self.cell_size)))
-        if blocked[gy][gx]:
+        self.relaxations = 0
+        self.expansions = 0
+        if blocked[gy * self.grid_w + gx]:
             # goal blocked, nothing reachable
-            self.costs = costs
-            for y in range(self.grid_h):
-                for x in range(self.grid_w):
-                    self._vectors[y][x][0] = math.nan
-                    self._vectors[y][x][1] = math.nan
+            self.costs = array("f", costs)
+            self._directions = bytearray([self.NO_DIRECTION]) * len(costs)
             self.max_distance = 0.0
             return
 
-        costs[gy][gx] = 0.0
-        q = deque([(gx, gy)])
+        if bounds is not None:
+            self.costs = array("f", costs)
+            self.costs[gy * self.grid_w + gx] = 0.0
+            self._directions = bytearray([self.UNKNOWN_DIRECTION]) * len(costs)
+            self._settled = bytearray(len(costs))
+            self._frontier = [(0.0, gx, gy)]
+            self.complete = False
+            self.max_distance = 0.0
+            self._settle(bounds)
+            return
 
+        costs[gy * self.grid_w + gx] = 0.0
+        if self.engine == "dijkstra":
+            counter = self._propagate_dijkstra(costs, blocked, gx, gy)
+        else:
+            counter = self._propagate_bfs(costs, blocked, gx, gy)
+        self.expansions = counter
+
+        self.costs = array("f", costs)
+        self._directions = bytearray([self.UNKNOWN_DIRECTION]) * len(costs)
+
+        inf = self.INF
+        self.max_distance = max((v for v in costs if v != inf), default=0.0)
+        now = datetime.now()
+        print(now.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3] + ' field_flow compute - done (counter: {})'.format(counter))
+
+
+    def _rasterize_obstacles(self, obstacles, margin):
+        """Return the flat blocked mask and the number of cells tested.
+
+        A cell is blocked when a circle of half the cell size around its
+        center touches an obstacle inflated by ``margin``. Each obstacle is
+        stamped by visiting only the cells inside its bounding box.
+        """
+        width = self.grid_w
+        blocked = bytearray(width * self.grid_h)
+        size = self.cell_size
+        half = size / 2
+        counter = 0
+        for shape in obstacles:
+            ox, oy = shape.center
+            x0, x1, y0, y1, reach_sq = self._obstacle_window(shape, margin)
+            for y in range(y0, y1 + 1):
+                dy = y * size + half - oy
+                dy_sq = dy * dy
+                if dy_sq > reach_sq:
+                    continue
+                row = y * width
+                for x in range(x0, x1 + 1):
+                    dx = x * size + half - ox
+                    if dx * dx + dy_sq <= reach_sq:
+                        blocked[row + x] = 1
+                counter += x1 - x0 + 1
+        return blocked, counter
+
+    def _obstacle_window(self, shape, margin):
+        """Return the cell window ``(x0, x1, y0, y1)`` touched by ``shape``.
+
+        The squared reach between a cell center and the obstacle center is
+        returned as the fifth element.
+        """
+        size = self.cell_size
+        half = size / 2
+        ox, oy = shape.center
+        reach = half + (shape.radius + margin)
+        x0 = max(0, math.ceil((ox - reach - half) / size))
+        x1 = min(self.grid_w - 1, math.floor((ox + reach - half) / size))
+        y0 = max(0, math.ceil((oy - reach - half) / size))
+        y1 = min(self.grid_h - 1, math.floor((oy + reach - half) / size))
+        return x0, x1, y0, y1, reach * reach
+
+    def _steps(self):
+        """Return ``(dx, dy, weight)`` for every neighbour direction."""
+        return [(dx, dy, (dx * dx + dy * dy) ** 0.5) for dx, dy in self.DIRECTIONS]
+
+    def _propagate_bfs(self, costs, blocked, gx, gy) -> int:
+        """Relax costs outward from the goal with a FIFO queue.
+
+        Returns the number of cells expanded; a cell is expanded again every
+        time a cheaper path to it is found.
+        """
+        q = deque([(gx, gy)])
+        steps = self._steps()
+        width, height = self.grid_w, self.grid_h
+        relaxations = 0
         counter = 0
 
         while q:
             cx, cy = q.popleft()
-            base = costs[cy][cx]
-            if counter % 30000 == 0 :
+            base = costs[cy * width + cx]
+            if self.cooperative and counter % 30000 == 0 :
                 #pass
                 time.sleep(0.01)
             counter += 1
-            for dx, dy in self.DIRECTIONS:
+            for dx, dy, weight in steps:
                 nx, ny = cx + dx, cy + dy
-                if 0 <= nx < self.grid_w and 0 <= ny < self.grid_h and not blocked[ny][nx]:
-                    new_cost = base + (dx * dx + dy * dy) ** 0.5
-                    if new_cost < costs[ny][nx]:
-                        costs[ny][nx] = new_cost
+                if 0 <= nx < width and 0 <= ny < height:
+                    n = ny * width + nx
+                    if blocked[n]:
+                        continue
+                    new_cost = base + weight
+                    if new_cost < costs[n]:
+                        costs[n] = new_cost
+                        relaxations += 1
                         q.append((nx, ny))
 
-        self.costs = costs
-        for y in range(self.grid_h):
-            for x in range(self.grid_w):
-                self._vectors[y][x][0] = math.nan
-                self._vectors[y][x][1] = math.nan
+        self.relaxations = relaxations
+        return counter
 
-        finite = [v for row in costs for v in row if math.isfinite(v)]
-        self.max_distance = max(finite) if finite else 0.0
-        now = datetime.now()
-        print(now.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3] + ' field_flow compute - done (counter: {})'.format(counter))
+    def _propagate_dijkstra(self, costs, blocked, gx, gy) -> int:
+        """Settle cells in order of increasing cost using a binary heap.
+
+        Returns the number of cells expanded, which is at most one per
+        reachable cell; outdated heap entries are skipped.
+        """
+        heap = [(0.0, gx, gy)]
+        steps = self._steps()
+        width, height = self.grid_w, self.grid_h
+        relaxations = 0
+        counter = 0
+
+        while heap:
+            base, cx, cy = heapq.heappop(heap)
+            if base > costs[cy * width + cx]:
+                continue
+            if self.cooperative and counter % 30000 == 0:
+                time.sleep(0.01)
+            counter += 1
+            for dx, dy, weight in steps:
+                nx, ny = cx + dx, cy + dy
+                if 0 <= nx < width and 0 <= ny < height:
+                    n = ny * width + nx
+                    if blocked[n]:
+                        continue
+                    new_cost = base + weight
+                    if new_cost < costs[n]:
+                        costs[n] = new_cost
+                        relaxations += 1
+                        heapq.heappush(heap, (new_cost, nx, ny))
+
+        self.relaxations = relaxations
+        return counter
+
+    # ------------------------------------------------------------------
+    # Bounded fields
+    # ------------------------------------------------------------------
+    def _cell_rect(self, bounds):
+        """Return the cell rectangle ``(x0, y0, x1, y1)`` of pixel ``bounds``."""
+        x0, y0 = self.cell_of((bounds[0], bounds[1]))
+        x1, y1 = self.cell_of((bounds[2], bounds[3]))
+        return x0, y0, x1, y1
+
+    def covers(self, bounds) -> bool:
+        """Return True if every free cell inside ``bounds`` has its final cost."""
+        if self.complete:
+            return True
+        x0, y0, x1, y1 = self._cell_rect(bounds)
+        width = self.grid_w
+        settled = self._settled
+        blocked = self.blocked
+        for y in range(y0, y1 + 1):
+            for i in range(y * width + x0, y * width + x1 + 1):
+                if not (settled[i] or blocked[i]):
+                    return False
+        return True
 
+    def extend(self, bounds) -> int:
+        """Continue a bounded search until ``bounds`` is covered.
+
+        Returns the number of cells settled. Directions are recomputed
+        lazily afterwards, so only extend fields nobody else is sampling
+        (see :meth:`copy`).
+        """
+        if self.complete:
+            return 0
+        counter = self._settle(bounds)
+        self._directions = bytearray([self.UNKNOWN_DIRECTION]) * len(self._directions)
+        return counter
+
+    def _settle(self, bounds) -> int:
+        """Pop the frontier until every free cell in ``bounds`` is settled."""
+        width, height = self.grid_w, self.grid_h
+        x0, y0, x1, y1 = self._cell_rect(bounds)
+        costs = self.costs
+        blocked = self.blocked
+        settled = self._settled
+        remaining = 0
+        for y in range(y0, y1 + 1):
+            for i in range(y * width + x0, y * width + x1 + 1):
+                if not (settled[i] or blocked[i]):
+                    remaining += 1
+
+        heap = self._frontier
+        steps = self._steps()
+        relaxations = 0
+        counter = 0
+        while heap and remaining:
+            base, cx, cy = heapq.heappop(heap)
+            index = cy * width + cx
+            if settled[index]:
+                continue
+            if self.cooperative and counter % 30000 == 0:
+                time.sleep(0.01)
+            counter += 1
+            settled[index] = 1
+            self.max_distance = base
+            if x0 <= cx <= x1 and y0 <= cy <= y1:
+                remaining -= 1
+            for dx, dy, weight in steps:
+                nx, ny = cx + dx, cy + dy
+                if 0 <= nx < width and 0 <= ny < height:
+                    n = ny * width + nx
+                    if blocked[n] or settled[n]:
+                        continue
+                    new_cost = base + weight
+                    if new_cost < costs[n]:
+                        costs[n] = new_cost
+                        relaxations += 1
+                        heapq.heappush(heap, (new_cost, nx, ny))
+
+        if not heap:
+            self.complete = True
+            self._frontier = None
+            self._settled = None
+        self.relaxations += relaxations
+        self.expansions += counter
+        return counter
+
+    # ------------------------------------------------------------------
+    # Incremental repair
+    # ------------------------------------------------------------------
+    # Slack absorbing float32 rounding of stored costs during repairs
+    REPAIR_TOLERANCE = 1e-3
+
+    def copy(self) -> "FlowField":
+        """Return an independent copy of this field."""
+        other = FlowField.__new__(FlowField)
+        other.__dict__.update(self.__dict__)
+        other.costs = array("f", self.costs)
+        other._directions = bytearray(self._directions)
+        other.blocked = bytearray(self.blocked)
+        if self._frontier is not None:
+            other._frontier = list(self._frontier)
+            other._settled = bytearray(self._settled)
+        return other
+
+    def repaired(
+        self,
+        removed: Iterable[CollisionShape],
+        obstacles: Iterable[CollisionShape],
+    ) -> "FlowField":
+        """Return a copy updated for the ``removed`` obstacles.
+
+        ``obstacles`` are the obstacles that remain. Cells that only the
+        removed obstacles covered are unblocked and costs are lowered
+        outward from them with a decrease-only Dijkstra, so only the region
+        that actually gets cheaper is expanded. This field is left
+        untouched and stays usable while the copy is repaired.
+
+        Only removed obstacles are repaired: a goal that moves to another
+        cell still needs a full :meth:`compute`.
+        """
+        if self.goal is None:
+            raise ValueError("cannot repair a flow field that was never computed")
+        if not self.complete:
+            raise ValueError("cannot repair a bounded flow field")
+        field = self.copy()
+        freed = field._unblock(list(removed), list(obstacles))
+        field._repair_from(freed)
+        return field
+
+    def _unblock(self, removed, obstacles):
+        """Clear mask cells no remaining obstacle covers; return them."""
+        width = self.grid_w
+        size = self.cell_size
+        half = size / 2
+        margin = self.margin
+        blocked = self.blocked
+        freed = []
+        for shape in removed:
+            x0, x1, y0, y1, _ = self._obstacle_window(shape, margin)
+            nearby = []
+            for other in obstacles:
+                ox0, ox1, oy0, oy1, reach_sq = self._obstacle_window(other, margin)
+                if ox0 <= x1 and x0 <= ox1 and oy0 <= y1 and y0 <= oy1:
+                    nearby.append((other.center[0], other.center[1], reach_sq))
+            for y in range(y0, y1 + 1):
+                cy = y * size + half
+                for x in range(x0, x1 + 1):
+                    index = y * width + x
+                    if not blocked[index]:
+                        continue
+                    cx = x * size + half
+                    if any(
+                        (cx - ox) ** 2 + (cy - oy) ** 2 <= reach_sq
+                        for ox, oy, reach_sq in nearby
+                    ):
+                        continue
+                    blocked[index] = 0
+                    freed.append(index)
+        return freed
+
+    def _repair_from(self, freed):
+        """Lower costs outward from the newly free cells ``freed``."""
+        width, height = self.grid_w, self.grid_h
+        costs = self.costs
+        blocked = self.blocked
+        steps = self._steps()
+        tolerance = self.REPAIR_TOLERANCE
+        gx, gy = self.cell_of(self.goal)
+        goal = gy * width + gx
+
+        heap = []
+        for index in freed:
+            y, x = divmod(index, width)
+            best = 0.0 if index == goal else self.INF
+            for dx, dy, weight in steps:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < width and 0 <= ny < height:
+                    n = ny * width + nx
+                    if not blocked[n]:
+                        best = min(best, costs[n] + weight)
+            if best < costs[index]:
+                costs[index] = best
+                heapq.heappush(heap, (best, x, y))
+
+        relaxations = 0
+        counter = 0
+        changed = set(freed)
+        while heap:
+            base, cx, cy = heapq.heappop(heap)
+            if base > costs[cy * width + cx] + tolerance:
+                continue
+            counter += 1
+            for dx, dy, weight in steps:
+                nx, ny = cx + dx, cy + dy
+                if 0 <= nx < width and 0 <= ny < height:
+                    n = ny * width + nx
+                    if blocked[n]:
+                        continue
+                    new_cost = base + weight
+                    if new_cost < costs[n] - tolerance:
+                        costs[n] = new_cost
+                        relaxations += 1
+                        changed.add(n)
+                        heapq.heappush(heap, (new_cost, nx, ny))
+                        if new_cost > self.max_distance:
+                            self.max_distance = new_cost
+
+        # Directions of changed cells and of their neighbours are stale
+        directions = self._directions
+        for index in changed:
+            y, x = divmod(index, width)
+            for ny in range(max(0, y - 1), min(height, y + 2)):
+                row = ny * width
+                for nx in range(max(0, x - 1), min(width, x + 2)):
+                    directions[row + nx] = self.UNKNOWN_DIRECTION
+        self.relaxations = relaxations
+        self.expansions = counter
+
+    # ------------------------------------------------------------------
+    # NumPy engine
+    # ------------------------------------------------------------------
+    def _compute_numpy(self, goal, obstacles, margin, blocked=None) -> int:
+        """Compute costs and every gradient direction with array operations."""
+        if blocked is None:
+            blocked = self._rasterize_obstacles_numpy(obstacles, margin)
+        else:
+            blocked = np.frombuffer(blocked, dtype=np.uint8).astype(bool)
+            blocked = blocked.reshape(self.grid_h, self.grid_w)
+        self.blocked = bytearray(blocked.tobytes())
+        gx = min(self.grid_w - 1, max(0, int(goal[0] / self.cell_size)))
+        gy = min(self.grid_h - 1, max(0, int(goal[1] / self.cell_size)))
+        costs = np.full((self.grid_h, self.grid_w), np.inf)
+        counter = 0
+        if not blocked[gy, gx]:
+            costs[gy, gx] = 0.0
+            counter = self._propagate_numpy(costs, blocked, gy)
+        self.relaxations = 0
+        self.expansions = counter
+        packed = costs.astype(np.float32)
+        self.costs = array("f", packed.tobytes())
+        self._directions = bytearray(self._gradient_numpy(packed).tobytes())
+        finite = costs[np.isfinite(costs)]
+        self.max_distance = float(finite.max()) if finite.size else 0.0
+        return counter
+
+    def _rasterize_obstacles_numpy(self, obstacles, margin):
+        """Return the blocked mask as a boolean ``(grid_h, grid_w)`` array."""
+        blocked = np.zeros((self.grid_h, self.grid_w), dtype=bool)
+        size = self.cell_size
+        half = size / 2
+        for shape in obstacles:
+            ox, oy = shape.center
+            x0, x1, y0, y1, reach_sq = self._obstacle_window(shape, margin)
+            if x0 > x1 or y0 > y1:
+                continue
+            dx = np.arange(x0, x1 + 1) * size + half - ox
+            dy = np.arange(y0, y1 + 1) * size + half - oy
+            blocked[y0:y1 + 1, x0:x1 + 1] |= (dx * dx)[None, :] + (dy * dy)[:, None] <= reach_sq
+        return blocked
+
+    def _propagate_numpy(self, costs, blocked, gy) -> int:
+        """Propagate ``costs`` in place with row sweeps until they settle.
+
+        Each row pulls costs from the previous row (straight and diagonal
+        steps) and then runs a forward and backward scan along itself. The
+        scans use ``minimum.accumulate`` on ``cost - x``; blocked cells split
+        a row into segments, and a large per-segment offset keeps costs from
+        leaking across them. A row is only revisited when the row it pulls
+        from has changed since its last sweep. Returns the rows swept.
+        """
+        height, width = costs.shape
+        idx = np.arange(width, dtype=np.float64)
+        big = 4.0 * costs.size
+        limit = big / 2
+        forward = -np.cumsum(blocked, axis=1) * big - idx
+        backward = -np.cumsum(blocked[:, ::-1], axis=1) * big - idx
+        tolerance = 1e-6
+        inf = np.inf
+
+        def relax(y, prev):
+            row = costs[y]
+            if prev is None:
+                new = row.copy()
+            else:
+                candidate = prev + 1.0
+                np.minimum(candidate[1:], prev[:-1] + SQRT2, out=candidate[1:])
+                np.minimum(candidate[:-1], prev[1:] + SQRT2, out=candidate[:-1])
+                candidate[blocked[y]] = inf
+                if not (candidate < row - tolerance).any():
+                    return False
+                new = np.minimum(row, candidate)
+            scan = new + forward[y]
+            np.minimum.accumulate(scan, out=scan)
+            scan -= forward[y]
+            np.minimum(new, scan, out=new)
+            reverse = new[::-1]
+            scan = reverse + backward[y]
+            np.minimum.accumulate(scan, out=scan)
+            scan -= backward[y]
+            np.minimum(reverse, scan, out=reverse)
+            new[new >= limit] = inf
+            costs[y] = new
+            versions[y] += 1
+            return True
+
+        versions = [0] * height
+        seen = {1: [None] * height, -1: [None] * height}
+        relax(gy, None)
+        counter = 1
+        changed = True
+        while changed:
+            changed = False
+            for step, rows in ((1, range(1, height)), (-1, range(height - 2, -1, -1))):
+                last = seen[step]
+                for y in rows:
+                    version = versions[y - step]
+                    if last[y] == version:
+                        continue
+                    last[y] = version
+                    counter += 1
+                    if relax(y, costs[y - step]):
+                        changed = True
+        return counter
+
+    def _gradient_numpy(self, costs):
+        """Return the uint8 direction code of every cell at once.
+
+        Matches :meth:`_compute_direction`: each cell points to its cheapest
+        neighbour, preferring earlier ``DIRECTIONS`` on ties, and cells
+        without a cheaper neighbour get ``NO_DIRECTION``.
+        """
+        height, width = costs.shape
+        padded = np.full((height + 2, width + 2), np.inf)
+        padded[1:-1, 1:-1] = costs
+        best = costs.copy()
+        codes = np.full((height, width), self.NO_DIRECTION, dtype=np.uint8)
+        better = np.empty((height, width), dtype=bool)
+        for code, (dx, dy) in enumerate(self.DIRECTIONS):
+            neighbour = padded[1 + dy:1 + dy + height, 1 + dx:1 + dx + width]
+            np.less(neighbour, best, out=better)
+            np.copyto(codes, code, where=better)
+            np.minimum(best, neighbour, out=best)
+        codes[~np.isfinite(costs)] = self.NO_DIRECTION
+        return codes
 
     def get_vector(self, pos: Tuple[float, float]) -> Tuple[float, float]:
-        """Return the flow vector for ``pos``."""
+        """Return the flow vector for ``pos``.
+
+        With ``cell_size`` larger than one the directions of the four
+        surrounding cell centers are blended bilinearly so that units do
+        not zig-zag along cell borders.
+        """
         if self.goal is None:
             return 0.0, 0.0
         x = min(self.grid_w - 1, max(0, int(pos[0] / self.cell_size)))
         y = min(self.grid_h - 1, max(0, int(pos[1] / self.cell_size)))
-        if math.isnan(self._vectors[y][x][0]):
-            self._vectors[y][x] = self._compute_vector(x, y)
-        return tuple(self._vectors[y][x])
+        code = self._direction_at(x, y)
+        if self.cell_size == 1 or code == self.NO_DIRECTION:
+            return self.DIRECTION_VECTORS[code]
+        return self._interpolate_vector(pos, self.DIRECTION_VECTORS[code])
 
     def get_distance(self, pos: Tuple[float, float]) -> float:
         """Return the cost distance for ``pos`` or ``INF`` if unreachable."""
@@ -150,31 +717,135 @@ class FlowField:
             return self.INF
         x = min(self.grid_w - 1, max(0, int(pos[0] / self.cell_size)))
         y = min(self.grid_h - 1, max(0, int(pos[1] / self.cell_size)))
-        value = self.costs[y][x]
+        value = self.costs[y * self.grid_w + x]
         return float(value) if math.isfinite(value) else self.INF
 
+    def get_vectors(self, positions) -> "np.ndarray":
+        """Return the flow vectors for many positions as an ``(N, 2)`` array.
+
+        Batch counterpart of :meth:`get_vector` for a sequence or array of
+        ``(x, y)`` positions.
+        """
+        points = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        if self.goal is None or len(points) == 0:
+            return np.zeros((len(points), 2))
+        table = np.array(self.DIRECTION_VECTORS)
+        index = self._cell_indices(points[:, 0], points[:, 1])
+        codes = self._direction_codes(index)
+        vectors = table[codes]
+        if self.cell_size == 1:
+            return vectors
+
+        fx = points[:, 0] / self.cell_size - 0.5
+        fy = points[:, 1] / self.cell_size - 0.5
+        x0 = np.floor(fx)
+        y0 = np.floor(fy)
+        tx = (fx - x0)[:, None]
+        ty = (fy - y0)[:, None]
+        blend = np.zeros_like(vectors)
+        for dx, dy, weight in (
+            (0, 0, (1 - tx) * (1 - ty)),
+            (1, 0, tx * (1 - ty)),
+            (0, 1, (1 - tx) * ty),
+            (1, 1, tx * ty),
+        ):
+            corner = self._cell_indices(x0 + dx, y0 + dy, scale=1)
+            blend += table[self._direction_codes(corner)] * weight
+        length = np.hypot(blend[:, 0], blend[:, 1])
+        smooth = (length >= 1e-6) & (codes != self.NO_DIRECTION)
+        vectors[smooth] = blend[smooth] / length[smooth, None]
+        return vectors
+
+    def get_distances(self, positions) -> "np.ndarray":
+        """Return the cost distances for many positions as an array."""
+        points = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        if self.goal is None:
+            return np.full(len(points), self.INF)
+        costs = np.frombuffer(self.costs, dtype=np.float32)
+        return costs[self._cell_indices(points[:, 0], points[:, 1])].astype(np.float64)
+
+    def _cell_indices(self, x, y, scale=None):
+        """Return flat indices of the cells containing ``x``/``y`` arrays.
+
+        Coordinates are divided by ``cell_size`` unless ``scale`` is given.
+        """
+        scale = self.cell_size if scale is None else scale
+        cx = np.clip(np.floor(x / scale), 0, self.grid_w - 1).astype(np.intp)
+        cy = np.clip(np.floor(y / scale), 0, self.grid_h - 1).astype(np.intp)
+        return cy * self.grid_w + cx
+
+    def _direction_codes(self, index):
+        """Return the direction codes at flat ``index``, filling unknown ones."""
+        directions = np.frombuffer(self._directions, dtype=np.uint8)
+        codes = directions[index]
+        unknown = codes == self.UNKNOWN_DIRECTION
+        if unknown.any():
+            for cell in np.unique(index[unknown]).tolist():
+                y, x = divmod(cell, self.grid_w)
+                self._direction_at(x, y)
+            codes = directions[index]
+        return codes
+
     # ------------------------------------------------------------------
     # Gradient helpers
     # ------------------------------------------------------------------
-    def _compute_vector(self, x: int, y: int) -> Tuple[float, float]:
-        """Compute normalized gradient at cell ``(x, y)``."""
-        if not math.isfinite(self.costs[y][x]):
-            return (0.0, 0.0)
-
-        best_cost = self.costs[y][x]
-        best = (0, 0)
-        for dx, dy in self.DIRECTIONS:
+    def _direction_at(self, x: int, y: int) -> int:
+        """Return the direction code of ``(x, y)``, computing it if needed."""
+        index = y * self.grid_w + x
+        code = self._directions[index]
+        if code == self.UNKNOWN_DIRECTION:
+            code = self._compute_direction(x, y)
+            self._directions[index] = code
+        return code
+
+    def _interpolate_vector(
+        self, pos: Tuple[float, float], fallback: Tuple[float, float]
+    ) -> Tuple[float, float]:
+        """Blend the directions of the cells whose centers surround ``pos``.
+
+        Unreachable cells carry no direction and are left out of the blend.
+        The result is normalized; ``fallback`` is returned when the blended
+        directions cancel out.
+        """
+        fx = pos[0] / self.cell_size - 0.5
+        fy = pos[1] / self.cell_size - 0.5
+        x0 = int(math.floor(fx))
+        y0 = int(math.floor(fy))
+        tx = fx - x0
+        ty = fy - y0
+        vx = vy = 0.0
+        for cx, cy, weight in (
+            (x0, y0, (1 - tx) * (1 - ty)),
+            (x0 + 1, y0, tx * (1 - ty)),
+            (x0, y0 + 1, (1 - tx) * ty),
+            (x0 + 1, y0 + 1, tx * ty),
+        ):
+            if weight <= 0:
+                continue
+            cx = min(self.grid_w - 1, max(0, cx))
+            cy = min(self.grid_h - 1, max(0, cy))
+            dx, dy = self.DIRECTION_VECTORS[self._direction_at(cx, cy)]
+            vx += dx * weight
+            vy += dy * weight
+        length = math.hypot(vx, vy)
+        if length < 1e-6:
+            return fallback
+        return vx / length, vy / length
+
+    def _compute_direction(self, x: int, y: int) -> int:
+        """Return the direction code of the cheapest neighbour of ``(x, y)``."""
+        width = self.grid_w
+        costs = self.costs
+        best_cost = costs[y * width + x]
+        if not math.isfinite(best_cost):
+            return self.NO_DIRECTION
+
+        best = self.NO_DIRECTION
+        for code, (dx, dy) in enumerate(self.DIRECTIONS):
             nx, ny = x + dx, y + dy
-            if 0 <= nx < self.grid_w and 0 <= ny < self.grid_h:
-                c = self.costs[ny][nx]
+            if 0 <= nx < width and 0 <= ny < self.grid_h:
+                c = costs[ny * width + nx]
                 if c < best_cost:
                     best_cost = c
-                    best = (dx, dy)
-
-        if best == (0, 0):
-            return (0.0, 0.0)
-
-        length = (best[0] ** 2 + best[1] ** 2) ** 0.5
-        if length == 0:
-            return (0.0, 0.0)
-        return (best[0] / length, best[1] / length)
+                    best = code
+        return best
@@ -0,0 +1,90 @@
+"""Process-wide cache of computed flow fields."""
+
+import threading
+from collections import OrderedDict, namedtuple
+
+
+FlowFieldKey = namedtuple(
+    "FlowFieldKey",
+    "width height cell_size goal_x goal_y obstacle_version margin engine bounded",
+)
+
+
+class FlowFieldCache:
+    """Least recently used store of :class:`FlowField` objects.
+
+    Fields are keyed by everything that determines their content (see
+    :meth:`key`), so swarms ordered to the same spot share one field. The
+    oldest entries are evicted once the stored fields exceed ``max_bytes``.
+    The cache is safe to use from the flow field worker threads.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    @staticmethod
+    def key(width, height, cell_size, goal, obstacle_version, margin, engine, bounded=False):
+        """Return the cache key of a field for ``goal`` on the given map.
+
+        Bounded fields may be incomplete and are only shared between
+        swarms that extend them as needed, hence ``bounded``.
+        """
+        return FlowFieldKey(
+            width,
+            height,
+            cell_size,
+            int(goal[0] // cell_size),
+            int(goal[1] // cell_size),
+            obstacle_version,
+            margin,
+            engine,
+            bounded,
+        )
+
+    def get(self, key):
+        """Return the field stored under ``key`` or ``None``."""
+        with self._lock:
+            field = self._entries.get(key)
+            if field is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return field
+
+    def put(self, key, field):
+        """Store ``field`` under ``key`` and evict old fields over the cap."""
+        size = field.nbytes
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous.nbytes
+            if size > self.max_bytes:
+                return
+            self._entries[key] = field
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+    def clear(self):
+        """Drop every stored field."""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+# Cache shared by every swarm in the process
+shared_cache = FlowFieldCache()
@@ -0,0 +1,80 @@
+"""Compute flow fields in worker processes."""
+
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from flow_field import FlowField
+from collision_shape import CollisionShape
+
+
+def _compute_shared(name, width, height, cell_size, engine, goal, obstacles, margin):
+    """Worker entry point: compute a field into the shared block ``name``."""
+    ff = FlowField(width, height, cell_size=cell_size, engine=engine)
+    ff.cooperative = False
+    ff.compute(goal, [CollisionShape(center, radius) for center, radius in obstacles], margin)
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        ff.write_buffers(block.buf)
+    finally:
+        block.close()
+    return ff.max_distance, ff.relaxations, ff.expansions
+
+
+class FlowFieldPool:
+    """Run :meth:`FlowField.compute` in a pool of worker processes.
+
+    Pure Python propagation holds the GIL for the whole computation, so
+    fields computed in threads stall the game loop. Workers receive the goal
+    and the obstacle circles and write costs and directions into a shared
+    memory block allocated here, which is copied into the returned field.
+    """
+
+    def __init__(self, max_workers=1, context="spawn"):
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context(context),
+        )
+
+    def submit(self, width, height, cell_size, engine, goal, obstacles, margin=0.0):
+        """Start computing a field and return a ``Future`` of the result."""
+        ff = FlowField(width, height, cell_size=cell_size, engine=engine)
+        ff.goal = goal
+        block = shared_memory.SharedMemory(create=True, size=ff.nbytes)
+        circles = [(tuple(shape.center), shape.radius) for shape in obstacles]
+        result = Future()
+        try:
+            job = self._executor.submit(
+                _compute_shared,
+                block.name,
+                width,
+                height,
+                cell_size,
+                engine,
+                goal,
+                circles,
+                margin,
+            )
+        except BaseException:
+            block.close()
+            block.unlink()
+            raise
+
+        def finish(job):
+            try:
+                ff.max_distance, ff.relaxations, ff.expansions = job.result()
+                ff.read_buffers(block.buf)
+            except BaseException as exc:
+                result.set_exception(exc)
+            else:
+                result.set_result(ff)
+            finally:
+                block.close()
+                block.unlink()
+
+        job.add_done_callback(finish)
+        return result
+
+    def shutdown(self, wait=True):
+        """Stop the worker processes."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,143 @@
+"""Central scheduling of flow field computations."""
+
+import logging
+import threading
+from collections import OrderedDict
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Job:
+    """A queued or running computation and the callbacks waiting for it."""
+
+    def __init__(self, key, compute):
+        self.key = key
+        self.compute = compute
+        self.subscribers = {}
+
+
+class FlowFieldScheduler:
+    """Own every flow field job of the game.
+
+    Each requester (usually a swarm) has at most one outstanding request:
+    a new :meth:`submit` supersedes the previous one, whose job is dropped
+    when nobody else waits for it. Requests with the same key share a
+    single job and at most ``max_workers`` jobs run at a time. Finished
+    fields are handed to every callback still subscribed; callers publish
+    them by swapping a reference, so the previous field stays usable until
+    then. A job that raises is logged and reported to the error callbacks
+    of its subscribers, so they can submit it again later.
+    """
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self.computed = 0
+        self.failed = 0
+        self._queued = OrderedDict()
+        self._running = {}
+        self._requests = {}
+        self._publishing = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._queued) + len(self._running)
+
+    def submit(self, owner, key, compute, callback, urgent=True, errback=None):
+        """Request the field ``key`` on behalf of ``owner``.
+
+        ``compute`` is called without arguments in a worker thread and
+        returns the field; ``callback`` receives it unless ``owner`` has
+        submitted another request or cancelled in the meantime. If
+        ``compute`` raises, ``errback`` receives the exception instead, on
+        the same terms. Urgent requests start before queued background ones.
+        """
+        with self._lock:
+            self._unsubscribe(owner)
+            job = self._queued.get(key) or self._running.get(key)
+            if job is None:
+                job = _Job(key, compute)
+                self._queued[key] = job
+            if urgent and key in self._queued:
+                self._queued.move_to_end(key, last=False)
+            job.subscribers[owner] = (callback, errback)
+            self._requests[owner] = key
+            self._dispatch()
+
+    def cancel(self, owner):
+        """Withdraw the outstanding request of ``owner``."""
+        with self._lock:
+            self._unsubscribe(owner)
+
+    def pending(self, owner):
+        """Return the key ``owner`` is waiting for or ``None``."""
+        with self._lock:
+            return self._requests.get(owner)
+
+    def join(self, timeout=None):
+        """Block until every job has finished and published its result."""
+        with self._idle:
+            return self._idle.wait_for(
+                lambda: not (self._queued or self._running or self._publishing),
+                timeout,
+            )
+
+    # ------------------------------------------------------------------
+    # Internal helpers, called with the lock held
+    # ------------------------------------------------------------------
+    def _unsubscribe(self, owner):
+        key = self._requests.pop(owner, None)
+        if key is None:
+            return
+        job = self._queued.get(key) or self._running.get(key)
+        if job is None:
+            return
+        job.subscribers.pop(owner, None)
+        if not job.subscribers and key in self._queued:
+            # Superseded before it started
+            del self._queued[key]
+            self._idle.notify_all()
+
+    def _dispatch(self):
+        while self._queued and len(self._running) < self.max_workers:
+            key, job = self._queued.popitem(last=False)
+            self._running[key] = job
+            threading.Thread(target=self._run, args=(job,), daemon=True).start()
+
+    def _run(self, job):
+        field = None
+        error = None
+        try:
+            field = job.compute()
+        except Exception as exc:
+            error = exc
+            logger.exception("flow field job %r failed", job.key)
+        finally:
+            with self._lock:
+                del self._running[job.key]
+                subscribers = list(job.subscribers.values())
+                for owner in job.subscribers:
+                    del self._requests[owner]
+                if error is None:
+                    self.computed += 1
+                else:
+                    self.failed += 1
+                self._publishing += 1
+                self._dispatch()
+            try:
+                for callback, errback in subscribers:
+                    if error is not None:
+                        if errback is not None:
+                            errback(error)
+                    elif field is not None:
+                        callback(field)
+            finally:
+                with self._lock:
+                    self._publishing -= 1
+                    self._idle.notify_all()
+
+
+# Scheduler shared by every swarm in the process
+shared_scheduler = FlowFieldScheduler()
@@ -0,0 +1,146 @@
+"""On-disk store of computed flow fields."""
+
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+
+from flow_field import FlowField
+
+
+class FlowFieldStore:
+    """Keep complete flow fields in binary files under ``directory``.
+
+    Files are named after a hash of the obstacle layout, the goal cell and
+    the field parameters, so fields survive between matches played on the
+    same layout. Each file holds a small header followed by the float32
+    costs, the direction codes and the obstacle mask, read back in one go.
+    Once the files exceed ``max_bytes`` the least recently used ones (by
+    modification time, refreshed on every load) are deleted. Their total
+    size is counted when the store opens and kept up to date on every save,
+    so the directory is only scanned again once it is over the cap.
+    """
+
+    MAGIC = b"FFLD"
+    FORMAT_VERSION = 1
+    # magic, format version, grid_w, grid_h, goal_x, goal_y, max_distance
+    HEADER = struct.Struct("<4sIIIddd")
+    SUFFIX = ".ffld"
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.nbytes = sum(size for _, size, _ in self._entries())
+
+    @staticmethod
+    def key(layout, width, height, cell_size, goal, margin, engine):
+        """Return the file key of a field for ``goal`` on obstacle ``layout``."""
+        text = repr((
+            layout,
+            width,
+            height,
+            cell_size,
+            int(goal[0] // cell_size),
+            int(goal[1] // cell_size),
+            margin,
+            engine,
+        ))
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def load(self, key, width, height, cell_size, engine):
+        """Return the stored field for ``key`` or ``None``."""
+        path = self._path(key)
+        ff = FlowField(width, height, cell_size=cell_size, engine=engine)
+        try:
+            with open(path, "rb") as handle:
+                data = handle.read()
+            header = self.HEADER.unpack_from(data)
+            magic, version, grid_w, grid_h, goal_x, goal_y, max_distance = header
+            if (
+                magic != self.MAGIC
+                or version != self.FORMAT_VERSION
+                or (grid_w, grid_h) != (ff.grid_w, ff.grid_h)
+                or len(data) != self.HEADER.size + ff.nbytes
+            ):
+                raise ValueError("unexpected flow field file")
+            ff.read_buffers(memoryview(data)[self.HEADER.size:])
+            os.utime(path)
+        except (OSError, ValueError, struct.error):
+            self.misses += 1
+            return None
+        ff.goal = (goal_x, goal_y)
+        ff.max_distance = max_distance
+        self.hits += 1
+        return ff
+
+    def save(self, key, ff):
+        """Write the complete field ``ff`` under ``key``."""
+        if ff.goal is None or not ff.complete:
+            return
+        header = self.HEADER.pack(
+            self.MAGIC,
+            self.FORMAT_VERSION,
+            ff.grid_w,
+            ff.grid_h,
+            ff.goal[0],
+            ff.goal[1],
+            ff.max_distance,
+        )
+        payload = bytearray(ff.nbytes)
+        ff.write_buffers(payload)
+        path = self._path(key)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(header)
+                handle.write(payload)
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        with self._lock:
+            self.nbytes += len(header) + len(payload) - replaced
+            over = self.nbytes > self.max_bytes
+        if over:
+            self._cleanup()
+
+    def _entries(self):
+        """Return ``(mtime, size, name)`` of every stored file."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def _cleanup(self):
+        """Delete least recently used files until the cap is respected."""
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                total -= size
+            self.nbytes = total
@@ -13,6 +13,9 @@ from destructibles import Destructibles
 from ai_player import AIPlayer
 from human_player import HumanPlayer
 from flag import NormalFlag, FastFlag, StopFlag
+from flow_field_pool import FlowFieldPool
+from flow_field_store import FlowFieldStore
+from hierarchical_planner import HierarchicalPlanner
 
 
 # Set to ``True`` to overlay the cost field of the active flag in grayscale.
@@ -33,6 +36,25 @@ class GameField(Stage):
     NUM_CANNONS = 3
     NUM_CANNONS_BLUE = 3
 
+    # Store swarm positions in NumPy arrays and tick them as batches
+    VECTORIZED_SWARMS = False
+
+    # Engine used by swarms to compute their flow fields (see FlowField)
+    FLOW_FIELD_ENGINE = "numpy"
+    # Flow fields use square cells of this many pixels per side
+    FLOW_CELL_SIZE = 4
+    # Worker processes computing flow fields; 0 computes them in threads
+    FLOW_FIELD_PROCESSES = 0
+    # Settle flow fields only this far around each swarm (None: whole map)
+    FLOW_FIELD_BOUNDS_MARGIN = None
+    # Coarse cell sizes steering swarms while their field is computed
+    FLOW_FIELD_COARSE_SIZES = (16, 8)
+    # Directory keeping flow fields between matches (None disables it)
+    FLOW_FIELD_STORE_DIR = None
+    # Plan over clusters of this many cells per side instead of flat fields,
+    # for large maps (None keeps flat fields)
+    FLOW_FIELD_CLUSTER_SIZE = None
+
     GROUP_FOOTMEN = 1
     GROUP_ARCHERS = 2
     GROUP_CANNON = 3
@@ -45,6 +67,26 @@ class GameField(Stage):
         self.width = width
         self.height = height
 
+        # Shared worker processes for flow field computation
+        self.flow_field_pool = None
+        if self.FLOW_FIELD_PROCESSES > 0:
+            self.flow_field_pool = FlowFieldPool(self.FLOW_FIELD_PROCESSES)
+
+        # Flow fields kept on disk between matches
+        self.flow_field_store = None
+        if self.FLOW_FIELD_STORE_DIR is not None:
+            self.flow_field_store = FlowFieldStore(self.FLOW_FIELD_STORE_DIR)
+
+        # Hierarchical planner shared by every swarm
+        self.flow_field_planner = None
+        if self.FLOW_FIELD_CLUSTER_SIZE is not None:
+            self.flow_field_planner = HierarchicalPlanner(
+                width,
+                height,
+                cell_size=self.FLOW_CELL_SIZE,
+                cluster_size=self.FLOW_FIELD_CLUSTER_SIZE,
+            )
+
         # Fonts for overlay information
         self.font = pygame.font.Font(None, 24)
 
@@ -74,6 +116,7 @@ class GameField(Stage):
             num_cannons=self.NUM_CANNONS,
             color=(255, 0, 0),
             flag_color=self.FLAG_COLOR_RED,
+            swarm_options=self._swarm_options(),
         )
         self.ai_player = AIPlayer(
             width,
@@ -82,6 +125,7 @@ class GameField(Stage):
             self.NUM_ARCHERS_BLUE,
             occupied,
             num_cannons=self.NUM_CANNONS_BLUE,
+            swarm_options=self._swarm_options(),
         )
 
         self.destructibles = Destructibles(
@@ -128,6 +172,19 @@ class GameField(Stage):
             self.GROUP_CANNON: self.swarm_cannon.queue,
         }
 
+    def _swarm_options(self):
+        """Return keyword arguments shared by every swarm on the field."""
+        return {
+            "vectorized": self.VECTORIZED_SWARMS,
+            "flow_field_engine": self.FLOW_FIELD_ENGINE,
+            "flow_cell_size": self.FLOW_CELL_SIZE,
+            "flow_field_pool": self.flow_field_pool,
+            "flow_field_bounds_margin": self.FLOW_FIELD_BOUNDS_MARGIN,
+            "flow_field_coarse_sizes": self.FLOW_FIELD_COARSE_SIZES,
+            "flow_field_store": self.flow_field_store,
+            "flow_field_planner": self.flow_field_planner,
+        }
+
     # ------------------------------------------------------------------
     # Event handling
     # ------------------------------------------------------------------
@@ -206,7 +263,7 @@ class GameField(Stage):
         cell = ff.cell_size
         for y in range(ff.grid_h):
             for x in range(ff.grid_w):
-                cost = ff.costs[y][x]
+                cost = ff.cost_at(x, y)
                 if cost == ff.INF:
                     continue
                 intensity = int(255 * (1 - cost / ff.max_distance))
@@ -0,0 +1,464 @@
+"""Hierarchical flow fields for maps too large for one flat field."""
+
+from collections import OrderedDict
+import heapq
+import threading
+from typing import Iterable, Tuple
+
+import numpy as np
+
+from collision_shape import CollisionShape
+from flow_field import FlowField
+
+
+class _PortalGraph:
+    """Portals of one obstacle layout and the costs between them."""
+
+    def __init__(self, blocked):
+        self.blocked = blocked
+        # Flat cell index, cluster and outgoing ``(node, cost)`` edges of
+        # every portal node
+        self.cells = []
+        self.clusters = []
+        self.edges = []
+        # ``(node, run)`` per portal leading into a neighbouring cluster,
+        # where ``run`` lists the ``(cell, offset)`` of the free border cells
+        # on that side and their distance to the portal
+        self.crossings = []
+        self.cluster_nodes = {}
+        self._node_of = {}
+
+    def node(self, cell, cluster):
+        node = self._node_of.get(cell)
+        if node is None:
+            node = len(self.cells)
+            self._node_of[cell] = node
+            self.cells.append(cell)
+            self.clusters.append(cluster)
+            self.edges.append([])
+            self.crossings.append([])
+            self.cluster_nodes.setdefault(cluster, []).append(node)
+        return node
+
+
+class HierarchicalPlanner:
+    """Plan paths on a grid split into square clusters of cells.
+
+    The grid of ``cell_size`` pixel cells is cut into clusters of
+    ``cluster_size`` cells per side. Once per obstacle layout the planner
+    places a portal in the middle of every free run of the border between
+    two neighbouring clusters and records the cost of crossing each cluster
+    from portal to portal. :meth:`field_to` searches this small graph from
+    the goal and returns a :class:`HierarchicalField`, whose cells are
+    computed one cluster at a time where units sample it.
+
+    Routes may only cross cluster borders at portals, so paths are slightly
+    longer than those of a flat :class:`FlowField`.
+    """
+
+    DIRECTIONS = FlowField.DIRECTIONS
+    NO_DIRECTION = FlowField.NO_DIRECTION
+    INF = float("inf")
+
+    def __init__(self, width: int, height: int, cell_size: int = 4, cluster_size: int = 16,
+                 max_graphs: int = 4):
+        if cluster_size < 2:
+            raise ValueError("cluster_size must be at least 2 cells")
+        self.width = width
+        self.height = height
+        self.cell_size = cell_size
+        self.cluster_size = cluster_size
+        self.grid_w = max(1, (width + cell_size - 1) // cell_size)
+        self.grid_h = max(1, (height + cell_size - 1) // cell_size)
+        self.clusters_w = (self.grid_w + cluster_size - 1) // cluster_size
+        self.clusters_h = (self.grid_h + cluster_size - 1) // cluster_size
+        self.max_graphs = max_graphs
+        self.builds = 0
+        self._graphs = OrderedDict()
+        self._lock = threading.Lock()
+        self._steps = [(dx, dy, (dx * dx + dy * dy) ** 0.5) for dx, dy in self.DIRECTIONS]
+
+    # ------------------------------------------------------------------
+    # Portal graph
+    # ------------------------------------------------------------------
+    def graph(
+        self, obstacles: Iterable[CollisionShape], margin: float = 0.0, layout: str = None
+    ) -> _PortalGraph:
+        """Return the portal graph of ``obstacles``, building it if needed.
+
+        ``layout`` identifies the obstacle set, e.g. the layout hash of
+        :class:`Destructibles`, which ignores trees shaking when hit. Without
+        it graphs are told apart by the obstacle circles themselves.
+        """
+        obstacles = list(obstacles)
+        if layout is None:
+            layout = tuple((tuple(shape.center), shape.radius) for shape in obstacles)
+        layout = (margin, layout)
+        with self._lock:
+            graph = self._graphs.get(layout)
+            if graph is not None:
+                self._graphs.move_to_end(layout)
+                return graph
+            graph = self._build(obstacles, margin)
+            self._graphs[layout] = graph
+            while len(self._graphs) > self.max_graphs:
+                self._graphs.popitem(last=False)
+            return graph
+
+    def _build(self, obstacles, margin):
+        raster = FlowField(self.width, self.height, cell_size=self.cell_size)
+        blocked, _ = raster._rasterize_obstacles(obstacles, margin)
+        graph = _PortalGraph(blocked)
+        for cy in range(self.clusters_h):
+            for cx in range(self.clusters_w):
+                x0, y0, x1, y1 = self.cluster_rect(cx, cy)
+                if x1 < self.grid_w:
+                    # Border with the cluster on the right
+                    self._add_portals(graph, [(x1 - 1, y) for y in range(y0, y1)], 1, 0)
+                if y1 < self.grid_h:
+                    # Border with the cluster below
+                    self._add_portals(graph, [(x, y1 - 1) for x in range(x0, x1)], 0, 1)
+        for cluster, nodes in graph.cluster_nodes.items():
+            rect = self.cluster_rect(*divmod(cluster, self.clusters_w)[::-1])
+            for node in nodes:
+                costs = self._search(blocked, rect, rect, {graph.cells[node]: 0.0})
+                for other in nodes:
+                    cost = costs[self._local_index(rect, graph.cells[other])]
+                    if other != node and cost != self.INF:
+                        graph.edges[node].append((other, cost))
+        self.builds += 1
+        return graph
+
+    def _add_portals(self, graph, border, dx, dy):
+        """Add a portal pair for every free run along ``border``."""
+        width = self.grid_w
+        blocked = graph.blocked
+        run = []
+        for step in border + [None]:
+            if step is not None:
+                x, y = step
+                inside = y * width + x
+                outside = (y + dy) * width + x + dx
+                if not blocked[inside] and not blocked[outside]:
+                    run.append((inside, outside))
+                    continue
+            if run:
+                mid = len(run) // 2
+                inside, outside = run[mid]
+                a = graph.node(inside, self.cluster_of_cell(inside))
+                b = graph.node(outside, self.cluster_of_cell(outside))
+                graph.edges[a].append((b, 1.0))
+                graph.edges[b].append((a, 1.0))
+                offsets = [abs(i - mid) for i in range(len(run))]
+                graph.crossings[a].append((b, [(o, d) for (_, o), d in zip(run, offsets)]))
+                graph.crossings[b].append((a, [(i, d) for (i, _), d in zip(run, offsets)]))
+                run = []
+
+    # ------------------------------------------------------------------
+    # Cluster geometry
+    # ------------------------------------------------------------------
+    def cluster_rect(self, cx: int, cy: int) -> Tuple[int, int, int, int]:
+        """Return the cells ``(x0, y0, x1, y1)`` of a cluster, ends excluded."""
+        size = self.cluster_size
+        return (
+            cx * size,
+            cy * size,
+            min(self.grid_w, (cx + 1) * size),
+            min(self.grid_h, (cy + 1) * size),
+        )
+
+    def cluster_of_cell(self, cell: int) -> int:
+        """Return the cluster id of the flat cell index ``cell``."""
+        y, x = divmod(cell, self.grid_w)
+        return (y // self.cluster_size) * self.clusters_w + x // self.cluster_size
+
+    def _local_index(self, rect, cell):
+        y, x = divmod(cell, self.grid_w)
+        return (y - rect[1]) * (rect[2] - rect[0]) + x - rect[0]
+
+    def _search(self, blocked, outer, inner, seeds):
+        """Dijkstra from ``seeds`` over the free cells of ``inner``.
+
+        Costs are returned as a flat list over the ``outer`` rectangle,
+        which may hold seeds around ``inner`` that are never expanded into.
+        """
+        grid_w = self.grid_w
+        ox0, oy0, ox1, oy1 = outer
+        ix0, iy0, ix1, iy1 = inner
+        span = ox1 - ox0
+        costs = [self.INF] * (span * (oy1 - oy0))
+        heap = []
+        for cell, cost in seeds.items():
+            y, x = divmod(cell, grid_w)
+            index = (y - oy0) * span + x - ox0
+            if cost < costs[index]:
+                costs[index] = cost
+                heap.append((cost, x, y))
+        heapq.heapify(heap)
+        while heap:
+            base, cx, cy = heapq.heappop(heap)
+            if base > costs[(cy - oy0) * span + cx - ox0]:
+                continue
+            for dx, dy, weight in self._steps:
+                nx, ny = cx + dx, cy + dy
+                if ix0 <= nx < ix1 and iy0 <= ny < iy1 and not blocked[ny * grid_w + nx]:
+                    index = (ny - oy0) * span + nx - ox0
+                    new_cost = base + weight
+                    if new_cost < costs[index]:
+                        costs[index] = new_cost
+                        heapq.heappush(heap, (new_cost, nx, ny))
+        return costs
+
+    # ------------------------------------------------------------------
+    # Fields
+    # ------------------------------------------------------------------
+    def field_to(
+        self,
+        goal: Tuple[float, float],
+        obstacles: Iterable[CollisionShape],
+        margin: float = 0.0,
+        max_clusters: int = 64,
+        layout: str = None,
+    ) -> "HierarchicalField":
+        """Return a field towards ``goal`` avoiding ``obstacles``.
+
+        At most ``max_clusters`` local fields are kept; older ones are
+        recomputed when sampled again. ``layout`` is passed on to
+        :meth:`graph`.
+        """
+        graph = self.graph(obstacles, margin, layout)
+        gx = min(self.grid_w - 1, max(0, int(goal[0] / self.cell_size)))
+        gy = min(self.grid_h - 1, max(0, int(goal[1] / self.cell_size)))
+        goal_cell = gy * self.grid_w + gx
+        distances = [self.INF] * len(graph.cells)
+        if not graph.blocked[goal_cell]:
+            cluster = self.cluster_of_cell(goal_cell)
+            rect = self.cluster_rect(*divmod(cluster, self.clusters_w)[::-1])
+            costs = self._search(graph.blocked, rect, rect, {goal_cell: 0.0})
+            heap = []
+            for node in graph.cluster_nodes.get(cluster, ()):
+                cost = costs[self._local_index(rect, graph.cells[node])]
+                if cost != self.INF:
+                    distances[node] = cost
+                    heap.append((cost, node))
+            heapq.heapify(heap)
+            while heap:
+                base, node = heapq.heappop(heap)
+                if base > distances[node]:
+                    continue
+                for other, weight in graph.edges[node]:
+                    if base + weight < distances[other]:
+                        distances[other] = base + weight
+                        heapq.heappush(heap, (base + weight, other))
+        return HierarchicalField(self, graph, goal, goal_cell, distances, max_clusters)
+
+
+class HierarchicalField:
+    """Flow field towards one goal, built lazily cluster by cluster.
+
+    Offers the sampling interface of :class:`FlowField`. The local field of
+    a cluster is seeded on the ring of cells around it with the base costs
+    of the neighbouring clusters (and with the goal itself), so units follow
+    the cheapest portal route without funnelling through the portal cells.
+    Every step of the field lowers the cost of the cell a unit stands on,
+    across cluster borders too, so following it always ends at the goal.
+    """
+
+    DIRECTION_VECTORS = FlowField.DIRECTION_VECTORS
+    NO_DIRECTION = FlowField.NO_DIRECTION
+    INF = float("inf")
+
+    def __init__(self, planner, graph, goal, goal_cell, distances, max_clusters=64):
+        self.planner = planner
+        self.goal = goal
+        self.width = planner.width
+        self.height = planner.height
+        self.cell_size = planner.cell_size
+        self.grid_w = planner.grid_w
+        self.grid_h = planner.grid_h
+        self.complete = True
+        self.max_clusters = max_clusters
+        self._graph = graph
+        self._goal_cell = goal_cell
+        self._distances = distances
+        self._locals = OrderedDict()
+        self._bases = OrderedDict()
+        self.max_distance = max((d for d in distances if d != self.INF), default=0.0)
+        # Fixed budget: the portal distances plus the largest local and base
+        # fields
+        size = planner.cluster_size
+        self.nbytes = 8 * len(distances) + max_clusters * 13 * size * size
+
+    @property
+    def built_clusters(self):
+        """Return the ids of the clusters whose local field is held."""
+        return list(self._locals)
+
+    def cell_of(self, pos: Tuple[float, float]) -> Tuple[int, int]:
+        """Return the grid cell containing ``pos``."""
+        return (
+            min(self.grid_w - 1, max(0, int(pos[0] / self.cell_size))),
+            min(self.grid_h - 1, max(0, int(pos[1] / self.cell_size))),
+        )
+
+    def cost_at(self, x: int, y: int) -> float:
+        """Return the cost of cell ``(x, y)``."""
+        rect, costs, _ = self._local(self.planner.cluster_of_cell(y * self.grid_w + x))
+        return float(costs[y - rect[1], x - rect[0]])
+
+    def route(self, start: Tuple[float, float], limit: int = None):
+        """Return the clusters visited following the field from ``start``."""
+        planner = self.planner
+        x, y = self.cell_of(start)
+        limit = self.grid_w * self.grid_h if limit is None else limit
+        clusters = []
+        for _ in range(limit):
+            cluster = planner.cluster_of_cell(y * self.grid_w + x)
+            if not clusters or clusters[-1] != cluster:
+                clusters.append(cluster)
+            rect, _, codes = self._local(cluster)
+            code = codes[y - rect[1], x - rect[0]]
+            if code == self.NO_DIRECTION:
+                break
+            dx, dy = planner.DIRECTIONS[code]
+            x, y = x + dx, y + dy
+        return clusters
+
+    def get_vector(self, pos: Tuple[float, float]) -> Tuple[float, float]:
+        """Return the direction vector at ``pos``."""
+        return tuple(self.get_vectors([pos])[0].tolist())
+
+    def get_distance(self, pos: Tuple[float, float]) -> float:
+        """Return the cost distance at ``pos``."""
+        return float(self.get_distances([pos])[0])
+
+    def get_vectors(self, positions) -> "np.ndarray":
+        """Return the direction vectors for many positions as an array."""
+        table = np.array(self.DIRECTION_VECTORS)
+        codes = self._gather(positions, 2, np.uint8)
+        return table[codes]
+
+    def get_distances(self, positions) -> "np.ndarray":
+        """Return the cost distances for many positions as an array."""
+        return self._gather(positions, 1, np.float64)
+
+    def _gather(self, positions, which, dtype):
+        points = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        planner = self.planner
+        size = planner.cluster_size
+        cx = np.clip(np.floor(points[:, 0] / self.cell_size), 0, self.grid_w - 1).astype(np.intp)
+        cy = np.clip(np.floor(points[:, 1] / self.cell_size), 0, self.grid_h - 1).astype(np.intp)
+        clusters = (cy // size) * planner.clusters_w + cx // size
+        result = np.zeros(len(points), dtype=dtype)
+        for cluster in np.unique(clusters).tolist():
+            local = self._local(cluster)
+            rect = local[0]
+            mask = clusters == cluster
+            result[mask] = local[which][cy[mask] - rect[1], cx[mask] - rect[0]]
+        return result
+
+    def _local(self, cluster):
+        """Return ``(rect, costs, codes)`` of ``cluster``, computing it if needed."""
+        local = self._locals.get(cluster)
+        if local is not None:
+            self._locals.move_to_end(cluster)
+            return local
+        local = self._compute_local(cluster)
+        self._locals[cluster] = local
+        while len(self._locals) > self.max_clusters:
+            self._locals.popitem(last=False)
+        return local
+
+    def _compute_local(self, cluster):
+        planner = self.planner
+        graph = self._graph
+        grid_w = self.grid_w
+        inner, outer = self._rects(cluster)
+        # Seed the ring around the cluster with the base costs of the
+        # clusters it belongs to, so every step out of this cluster lands on
+        # a cell whose own cost is lower
+        seeds = {}
+        owners = {}
+        for y in range(outer[1], outer[3]):
+            for x in range(outer[0], outer[2]):
+                if inner[0] <= x < inner[2] and inner[1] <= y < inner[3]:
+                    continue
+                cell = y * grid_w + x
+                if not graph.blocked[cell]:
+                    owners.setdefault(planner.cluster_of_cell(cell), []).append((x, y, cell))
+        for owner, cells in owners.items():
+            rect, base = self._base(owner)
+            for x, y, cell in cells:
+                cost = float(base[y - rect[1], x - rect[0]])
+                if cost != self.INF:
+                    seeds[cell] = cost
+        if planner.cluster_of_cell(self._goal_cell) == cluster and not graph.blocked[self._goal_cell]:
+            seeds[self._goal_cell] = 0.0
+        costs = planner._search(graph.blocked, outer, inner, seeds)
+
+        span = outer[2] - outer[0]
+        width, height = inner[2] - inner[0], inner[3] - inner[1]
+        codes = np.full((height, width), self.NO_DIRECTION, dtype=np.uint8)
+        local_costs = np.empty((height, width), dtype=np.float32)
+        for y in range(inner[1], inner[3]):
+            for x in range(inner[0], inner[2]):
+                best_cost = costs[(y - outer[1]) * span + x - outer[0]]
+                local_costs[y - inner[1], x - inner[0]] = best_cost
+                if best_cost == self.INF:
+                    continue
+                best = self.NO_DIRECTION
+                for code, (dx, dy) in enumerate(planner.DIRECTIONS):
+                    nx, ny = x + dx, y + dy
+                    if outer[0] <= nx < outer[2] and outer[1] <= ny < outer[3]:
+                        c = costs[(ny - outer[1]) * span + nx - outer[0]]
+                        if c < best_cost:
+                            best_cost = c
+                            best = code
+                codes[y - inner[1], x - inner[0]] = best
+        return inner, local_costs, codes
+
+    def _base(self, cluster):
+        """Return ``(rect, costs)`` of the base costs of ``cluster``.
+
+        Base costs only depend on the portal distances: the cluster is
+        searched from the free border runs just outside it, each costing the
+        distance of its portal plus the walk along the run to it. That walk
+        exists, so a base cost never undercuts the cost the cluster's own
+        field gives the same cell, which keeps the fields free of cycles.
+        """
+        base = self._bases.get(cluster)
+        if base is not None:
+            self._bases.move_to_end(cluster)
+            return base
+        planner = self.planner
+        graph = self._graph
+        inner, outer = self._rects(cluster)
+        seeds = {}
+        for node in graph.cluster_nodes.get(cluster, ()):
+            for other, run in graph.crossings[node]:
+                distance = self._distances[other]
+                if distance == self.INF:
+                    continue
+                for cell, offset in run:
+                    if distance + offset < seeds.get(cell, self.INF):
+                        seeds[cell] = distance + offset
+        if planner.cluster_of_cell(self._goal_cell) == cluster and not graph.blocked[self._goal_cell]:
+            seeds[self._goal_cell] = 0.0
+        costs = planner._search(graph.blocked, outer, inner, seeds)
+        costs = np.array(costs).reshape(outer[3] - outer[1], outer[2] - outer[0])
+        base = (inner, costs[inner[1] - outer[1]:inner[3] - outer[1], inner[0] - outer[0]:inner[2] - outer[0]].copy())
+        self._bases[cluster] = base
+        while len(self._bases) > self.max_clusters:
+            self._bases.popitem(last=False)
+        return base
+
+    def _rects(self, cluster):
+        """Return the cells of ``cluster`` and of the cluster with its ring."""
+        inner = self.planner.cluster_rect(*divmod(cluster, self.planner.clusters_w)[::-1])
+        outer = (
+            max(0, inner[0] - 1),
+            max(0, inner[1] - 1),
+            min(self.grid_w, inner[2] + 1),
+            min(self.grid_h, inner[3] + 1),
+        )
+        return inner, outer
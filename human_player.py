@@ -27,8 +27,11 @@ class HumanPlayer(Player):
         num_cannons=3,
         color=(255, 0, 0),
         flag_color=(255, 100, 100),
+        swarm_options=None,
     ):
         super().__init__()
+        # Extra keyword arguments forwarded to every swarm constructor
+        swarm_options = swarm_options or {}
         self.width = width
         self.height = height
 
@@ -40,6 +43,7 @@ class HumanPlayer(Player):
             height=height,
             attack_range=ATTACK_RANGE,
             kill_probability=KILL_PROBABILITY,
+            **swarm_options,
         )
         self.swarm_archers = SwarmArchers(
             color,
@@ -49,6 +53,7 @@ class HumanPlayer(Player):
             height=height,
             attack_range=ARCHER_ATTACK_RANGE,
             kill_probability=ARCHER_KILL_PROBABILITY,
+            **swarm_options,
         )
         self.swarm_cannon = SwarmCannon(
             color,
@@ -57,6 +62,7 @@ class HumanPlayer(Player):
             width=width,
             height=height,
             owner=self,
+            **swarm_options,
         )
 
         self.swarm_footmen.owner = self
@@ -0,0 +1,101 @@
+"""Uniform grid spatial hashing used for neighbour queries."""
+
+import math
+
+import numpy as np
+
+
+class SpatialHash:
+    """Bucket points into square cells for fast neighbourhood lookups.
+
+    Buckets are ``cell_size`` wide, so every point closer than ``cell_size``
+    to a query position is stored in the 3x3 block of cells around it.
+    """
+
+    def __init__(self, cell_size, points=()):
+        self.cell_size = float(cell_size) if cell_size > 0 else 1.0
+        self._buckets = {}
+        self._count = 0
+        for x, y in points:
+            self.insert(x, y)
+
+    def __len__(self):
+        return self._count
+
+    def _key(self, x, y):
+        return (
+            int(math.floor(x / self.cell_size)),
+            int(math.floor(y / self.cell_size)),
+        )
+
+    def insert(self, x, y):
+        """Add the point ``(x, y)`` to its bucket."""
+        key = self._key(x, y)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._buckets[key] = [(x, y)]
+        else:
+            bucket.append((x, y))
+        self._count += 1
+
+    def neighbors(self, x, y):
+        """Return all points stored in the cells surrounding ``(x, y)``."""
+        cx, cy = self._key(x, y)
+        buckets = self._buckets
+        result = []
+        for ky in (cy - 1, cy, cy + 1):
+            for kx in (cx - 1, cx, cx + 1):
+                bucket = buckets.get((kx, ky))
+                if bucket:
+                    result.extend(bucket)
+        return result
+
+
+def neighbor_pairs(points, cell_size, others=None):
+    """Return candidate index pairs ``(i, j)`` of nearby points.
+
+    ``points`` is an ``(N, 2)`` array of query positions and ``others`` the
+    ``(M, 2)`` array they are matched against (``points`` itself when omitted,
+    in which case every point is also paired with itself). Both are bucketed
+    into ``cell_size`` cells and each ``points[i]`` is paired with every
+    ``others[j]`` in the 3x3 block of cells around it, so all pairs closer
+    than ``cell_size`` are reported. Callers filter by exact distance.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    others = points if others is None else np.asarray(others, dtype=np.float64).reshape(-1, 2)
+    empty = np.empty(0, dtype=np.intp)
+    if len(points) == 0 or len(others) == 0:
+        return empty, empty
+    cell = float(cell_size) if cell_size > 0 else 1.0
+
+    query_cells = np.floor(points / cell).astype(np.int64)
+    other_cells = np.floor(others / cell).astype(np.int64)
+    origin = np.minimum(query_cells.min(axis=0), other_cells.min(axis=0)) - 1
+    query_cells -= origin
+    other_cells -= origin
+    # Leave a spare column so that x + 1 never wraps into the next row.
+    stride = int(max(query_cells[:, 0].max(), other_cells[:, 0].max())) + 2
+
+    other_keys = other_cells[:, 1] * stride + other_cells[:, 0]
+    order = np.argsort(other_keys, kind="stable")
+    sorted_keys = other_keys[order]
+    query_keys = query_cells[:, 1] * stride + query_cells[:, 0]
+
+    rows_i = []
+    rows_j = []
+    for dy in (-1, 0, 1):
+        # Cells ``x - 1 .. x + 1`` of a row are contiguous in key order.
+        row_keys = query_keys + dy * stride
+        start = np.searchsorted(sorted_keys, row_keys - 1, side="left")
+        end = np.searchsorted(sorted_keys, row_keys + 1, side="right")
+        counts = end - start
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        i = np.repeat(np.arange(len(points)), counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        rows_i.append(i)
+        rows_j.append(order[np.repeat(start, counts) + offsets])
+    if not rows_i:
+        return empty, empty
+    return np.concatenate(rows_i), np.concatenate(rows_j)
@@ -1,3 +1,6 @@
+from collision_shape import sweep_and_prune
+
+
 class Stage:
     """Basic stage element that can contain child stages."""
 
@@ -92,25 +95,35 @@ class Stage:
         """Handle a collision with ``stage``. Subclasses may override."""
         pass
 
+    def onMutualCollision(self, stage):
+        """Handle a collision with ``stage`` for both sides at once.
+
+        Called once per colliding pair. The default calls this stage's
+        :meth:`onCollision` and then the one of ``stage``; subclasses may
+        override it to share work between the two sides.
+        """
+        self.onCollision(stage)
+        stage.onCollision(self)
+
     # ------------------------------------------------------------------
     # Collision handling helpers
     # ------------------------------------------------------------------
-    def _collect_collision_stages(self):
-        stages = []
-        if self.getCollisionShape() is not None:
-            stages.append(self)
+    def _collect_collision_shapes(self, result=None):
+        """Return ``(stage, shape)`` pairs for every collidable stage in the tree."""
+        if result is None:
+            result = []
+        shape = self.getCollisionShape()
+        if shape is not None:
+            result.append((self, shape))
         for child in self._children:
-            stages.extend(child._collect_collision_stages())
-        return stages
+            child._collect_collision_shapes(result)
+        return result
 
     def _resolve_collisions(self):
-        stages = self._collect_collision_stages()
-        for i in range(len(stages)):
-            for j in range(i + 1, len(stages)):
-                s1 = stages[i]
-                s2 = stages[j]
-                shape1 = s1.getCollisionShape()
-                shape2 = s2.getCollisionShape()
-                if shape1 and shape2 and shape1.collidesWith(shape2):
-                    s1.onCollision(s2)
-                    s2.onCollision(s1)
+        # Shapes are fetched once per pass; the broad phase then reports
+        # only pairs overlapping on x to the exact circle test.
+        entries = self._collect_collision_shapes()
+        shapes = [shape for _, shape in entries]
+        for i, j in sweep_and_prune(shapes):
+            if shapes[i].collidesWith(shapes[j]):
+                entries[i][0].onMutualCollision(entries[j][0])
@@ -1,6 +1,8 @@
 import math
 import random
 import threading
+import weakref
+import numpy as np
 import pygame
 
 from stage import Stage
@@ -8,6 +10,9 @@ from order_queue import OrderQueue
 from flag import FastFlag
 from collision_shape import CollisionShape
 from flow_field import FlowField
+from flow_field_cache import shared_cache
+from flow_field_scheduler import shared_scheduler
+from spatial_hash import SpatialHash, neighbor_pairs
 from particle_shot import ParticleShot
 from cannon_bullet import CannonBullet
 
@@ -21,6 +26,9 @@ KILL_PROBABILITY = 0.02
 ARCHER_ATTACK_RANGE = 60
 ARCHER_KILL_PROBABILITY = KILL_PROBABILITY / 3
 
+# Clearance kept between flow field paths and obstacles
+FLOW_FIELD_MARGIN = 5.0
+
 # Distance from attacker to display particle effects
 PARTICLE_DISTANCE = 5
 
@@ -40,8 +48,11 @@ def lighten(color, factor=0.5):
 
 def compute_centroid(ants):
     """Return the centroid of ``ants`` or ``None`` if empty."""
-    if not ants:
+    if len(ants) == 0:
         return None
+    if isinstance(ants, np.ndarray):
+        x, y = ants.mean(axis=0)
+        return int(x), int(y)
     x = sum(a[0] for a in ants) / len(ants)
     y = sum(a[1] for a in ants) / len(ants)
     return int(x), int(y)
@@ -92,7 +103,7 @@ def draw_ants(
         elif shape == "triangle":
             half = TRIANGLE_SIZE // 2
             angle = 0.0
-            if orientations and i < len(orientations):
+            if orientations is not None and i < len(orientations):
                 angle = orientations[i]
             points = [
                 (
@@ -113,9 +124,13 @@ def draw_ants(
             pygame.draw.circle(screen, c, center, DOT_SIZE // 2)
 
 
-def draw_group_banner(screen, ants, color, number, active=False):
-    """Draw control group banner with ``number`` at the ants' center of mass."""
-    center = compute_centroid(ants)
+def draw_group_banner(screen, ants, color, number, active=False, center=None):
+    """Draw control group banner with ``number`` at the ants' center of mass.
+
+    ``center`` may be passed when the centroid is already known.
+    """
+    if center is None:
+        center = compute_centroid(ants)
     if center is None:
         return
     rect_width, rect_height = 14, 10
@@ -188,6 +203,16 @@ def draw_dotted_circle(screen, center, radius, color=(255, 165, 0), segments=60)
             pygame.draw.line(screen, color, points[i], points[i + 1])
 
 
+def _first_targets(attackers, defenders):
+    """Return arrays ``(i, j)`` keeping the lowest ``j`` of every ``i``, by ``i``."""
+    order = np.lexsort((defenders, attackers))
+    attackers = attackers[order]
+    defenders = defenders[order]
+    first = np.ones(len(attackers), dtype=bool)
+    first[1:] = attackers[1:] != attackers[:-1]
+    return attackers[first], defenders[first]
+
+
 class Swarm(Stage):
     """Base group of units belonging to a single player."""
 
@@ -205,9 +230,23 @@ class Swarm(Stage):
         owner=None,
         show_particles=False,
         arrow_particles=False,
+        vectorized=False,
+        flow_field_engine="bfs",
+        flow_cell_size=1,
+        flow_field_cache=None,
+        flow_field_pool=None,
+        flow_field_scheduler=None,
+        flow_field_prefetch=2,
+        line_of_sight=True,
+        flow_field_bounds_margin=None,
+        flow_field_coarse_sizes=(),
+        flow_field_store=None,
+        flow_field_planner=None,
     ):
         super().__init__()
-        self.ants = []
+        # Keep positions in a float32 ``(N, 2)`` array and run the tick as
+        # batched array operations instead of per-ant Python loops.
+        self.vectorized = vectorized
         self.color = color
         self.engaged_color = lighten(color)
         self.shape = shape
@@ -217,8 +256,21 @@ class Swarm(Stage):
         self.engaged = set()
         self.colliding_swarms = []
 
-        # Cached centroid value for performance
-        self._centroid_cache = None
+        # Running aggregates over the units, refreshed whenever positions
+        # are replaced and adjusted in place when units are removed.
+        self._aggregate_count = 0
+        self._sum_x = 0.0
+        self._sum_y = 0.0
+        self._centroid = None
+        self._bounds = None
+        self._spread = 0.0
+        # Stable ascending id of every unit, removed together with it
+        self.unit_ids = np.empty(0, dtype=np.int64)
+        self._next_unit_id = 0
+        # Per defender swarm, the ``(attacker ids, target ids)`` of the last
+        # fight, so attackers keep their target while it stays in range
+        self._targets = weakref.WeakKeyDictionary()
+        self.ants = []
 
         self.width = width
         self.height = height
@@ -244,21 +296,203 @@ class Swarm(Stage):
         self.add_stage(self.queue)
 
         # Flow field cache for the current target flag
+        self.flow_field_engine = flow_field_engine
+        self.flow_cell_size = flow_cell_size
+        self.flow_field_cache = shared_cache if flow_field_cache is None else flow_field_cache
+        self.flow_field_scheduler = (
+            shared_scheduler if flow_field_scheduler is None else flow_field_scheduler
+        )
+        # Optional FlowFieldPool computing fields in worker processes instead
+        # of a thread of this process
+        self.flow_field_pool = flow_field_pool
+        # Live field, the cache key it was computed for and the key of the
+        # field that should replace it
         self._flow_field = None
-        self._flow_field_flag = None
-        self._flow_field_dirty = True
-        self._flow_field_thread = None
+        self._flow_field_live_key = None
+        self._flow_field_wanted_key = None
+        # ``(version, shape)`` of obstacles removed after the live field was
+        # computed, which a repair can clear incrementally
+        self._flow_field_removed = []
         self._flow_field_lock = threading.Lock()
+        # Number of flags behind the head whose fields are computed ahead
+        self.flow_field_prefetch = flow_field_prefetch
+        self._queue_head = None
+        # Seek flags directly, without a flow field, when nothing is in the
+        # way; the last test is kept as ``(inputs, clear)``
+        self.line_of_sight = line_of_sight
+        self._line_of_sight = None
+        # When set, fields are only settled over the swarm's bounding box
+        # grown by this many pixels and extended as the swarm moves
+        self.flow_field_bounds_margin = flow_field_bounds_margin
+        self._flow_field_covered = None
+        # The ``(key, rect)`` of the last extension that failed
+        self._flow_field_extend_failed = None
+        # Coarser cell sizes, coarsest first, of provisional fields steering
+        # the swarm while the full resolution field is computed. The first
+        # is computed right away, the others in the background.
+        self.flow_field_coarse_sizes = tuple(flow_field_coarse_sizes)
+        # Optional FlowFieldStore keeping fields on disk between matches
+        self.flow_field_store = flow_field_store
+        # Optional HierarchicalPlanner replacing the flat field, for maps too
+        # large to cover with one; bounds, coarse fields, repairs and the
+        # store only apply to flat fields
+        self.flow_field_planner = flow_field_planner
+
+    @property
+    def ants(self):
+        """Unit positions as a list of ``[x, y]`` or a float32 array."""
+        return self._ants
+
+    @ants.setter
+    def ants(self, value):
+        if self.vectorized:
+            value = np.array(value, dtype=np.float32).reshape(-1, 2)
+        if len(value) != len(self.unit_ids):
+            # A different set of units rather than the same ones moved
+            self.unit_ids = np.empty(0, dtype=np.int64)
+            self._new_unit_ids(len(value))
+        self._ants = value
+        self._refresh_aggregates()
+
+    def _new_unit_ids(self, count):
+        """Append ``count`` fresh ids to ``unit_ids``."""
+        start = self._next_unit_id
+        self._next_unit_id += count
+        self.unit_ids = np.concatenate([self.unit_ids, np.arange(start, start + count)])
+
+    def _ensure_unit_ids(self):
+        """Give ids to units appended directly and drop those of popped ones.
+
+        Direct ``pop`` calls do not say which unit left, so ids are trimmed
+        from the end; the first fight afterwards may retarget some attackers.
+        """
+        extra = len(self._ants) - len(self.unit_ids)
+        if extra > 0:
+            self._new_unit_ids(extra)
+        elif extra < 0:
+            self.unit_ids = self.unit_ids[:len(self._ants)]
+
+    def _append_ants(self, points):
+        """Append ``points`` to the swarm's positions."""
+        if self.vectorized:
+            points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+            self._new_unit_ids(len(points))
+            self.ants = np.concatenate([self._ants, points])
+        else:
+            self._ants.extend(points)
+            self._new_unit_ids(len(points))
+            self._refresh_aggregates()
+
+    def remove_ants(self, indices):
+        """Remove the units at ``indices`` from the swarm."""
+        indices = sorted(set(indices), reverse=True)
+        if not indices:
+            return
+        self._ensure_aggregates()
+        self._ensure_unit_ids()
+        removed = [tuple(self._ants[j]) for j in indices]
+        self.unit_ids = np.delete(self.unit_ids, indices)
+        if self.vectorized:
+            self._ants = np.delete(self._ants, indices, axis=0)
+        else:
+            for j in indices:
+                self._ants.pop(j)
+        self._discount_aggregates(removed)
+
+    # ------------------------------------------------------------------
+    # Aggregates
+    # ------------------------------------------------------------------
+    def _refresh_aggregates(self):
+        """Recompute sums, extents and spread from the current positions."""
+        ants = self._ants
+        count = len(ants)
+        self._aggregate_count = count
+        if count == 0:
+            self._sum_x = self._sum_y = 0.0
+            self._centroid = None
+            self._bounds = None
+            self._spread = 0.0
+            return
+        if self.vectorized:
+            sums = ants.sum(axis=0, dtype=np.float64)
+            low = ants.min(axis=0)
+            high = ants.max(axis=0)
+            self._sum_x = float(sums[0])
+            self._sum_y = float(sums[1])
+            self._bounds = (float(low[0]), float(low[1]), float(high[0]), float(high[1]))
+            cx = int(self._sum_x / count)
+            cy = int(self._sum_y / count)
+            spread = float(np.hypot(ants[:, 0] - cx, ants[:, 1] - cy).max())
+        else:
+            sum_x = sum_y = 0.0
+            min_x = min_y = math.inf
+            max_x = max_y = -math.inf
+            for x, y in ants:
+                sum_x += x
+                sum_y += y
+                if x < min_x:
+                    min_x = x
+                if x > max_x:
+                    max_x = x
+                if y < min_y:
+                    min_y = y
+                if y > max_y:
+                    max_y = y
+            self._sum_x = sum_x
+            self._sum_y = sum_y
+            self._bounds = (min_x, min_y, max_x, max_y)
+            cx = int(sum_x / count)
+            cy = int(sum_y / count)
+            far = 0.0
+            for x, y in ants:
+                d2 = (x - cx) ** 2 + (y - cy) ** 2
+                if d2 > far:
+                    far = d2
+            spread = math.sqrt(far)
+        self._centroid = (cx, cy)
+        self._spread = spread
+
+    def _discount_aggregates(self, removed):
+        """Update the aggregates after the units at ``removed`` were dropped.
+
+        Sums stay exact. The bounding box and spread are kept as upper
+        bounds: the box still encloses every unit and the spread grows by
+        the distance the centroid moved. Both are tightened on the next
+        refresh.
+        """
+        count = self._aggregate_count - len(removed)
+        if count <= 0:
+            self._refresh_aggregates()
+            return
+        for x, y in removed:
+            self._sum_x -= x
+            self._sum_y -= y
+        self._aggregate_count = count
+        old_x, old_y = self._centroid
+        cx = int(self._sum_x / count)
+        cy = int(self._sum_y / count)
+        self._centroid = (cx, cy)
+        self._spread += math.hypot(cx - old_x, cy - old_y)
+
+    def _ensure_aggregates(self):
+        """Refresh the aggregates if units were added or popped directly."""
+        if len(self._ants) != self._aggregate_count:
+            self._refresh_aggregates()
 
     def compute_centroid(self):
-        """Return the cached centroid of the swarm's units."""
-        if self._centroid_cache is None:
-            self._centroid_cache = compute_centroid(self.ants)
-        return self._centroid_cache
+        """Return the centroid of the swarm's units."""
+        self._ensure_aggregates()
+        return self._centroid
+
+    def get_bounds(self):
+        """Return ``(min_x, min_y, max_x, max_y)`` enclosing every unit."""
+        self._ensure_aggregates()
+        return self._bounds
 
-    def _invalidate_centroid_cache(self):
-        """Clear the cached centroid."""
-        self._centroid_cache = None
+    def get_spread(self):
+        """Return the distance from the centroid to the farthest unit."""
+        self._ensure_aggregates()
+        return self._spread
 
     def getPosition(self):
         """Return the centroid position of this swarm."""
@@ -269,110 +503,527 @@ class Swarm(Stage):
         center = self.compute_centroid()
         if center is None:
             return None
-        radius = 0.0
-        cx, cy = center
-        for x, y in self.ants:
-            dist = math.hypot(x - cx, y - cy)
-            if dist > radius:
-                radius = dist
 
         # Expand the collision radius by the swarm's attack range so that
         # swarms register a collision when they are close enough to fight.
-        radius += self.attack_range
+        radius = self._spread + self.attack_range
 
         return CollisionShape(center, radius)
 
-    def _attack(self, defender):
-        """Engage ``defender`` swarm, potentially removing its units."""
+    def _attack(self, defender, targets=None):
+        """Engage ``defender`` swarm, potentially removing its units.
+
+        ``targets`` are the ``(i, j)`` pairs of :meth:`_attack_targets` when
+        already known. Returns the indices of the removed defenders.
+        """
         if self.is_fast_moving() or not hasattr(defender, "ants"):
-            return
+            return []
+        if targets is None:
+            targets = self._attack_targets(defender)
         engaged_self = set()
         engaged_other = set()
         remove_indices = []
-        range_sq = self.attack_range * self.attack_range
-        for i, (ax, ay) in enumerate(self.ants):
-            for j, (dx, dy) in enumerate(defender.ants):
-                if (ax - dx) ** 2 + (ay - dy) ** 2 <= range_sq:
-                    engaged_self.add(i)
-                    engaged_other.add(j)
-                    hit = random.random() < self.kill_probability
-                    if hit:
-                        if self.particle_shot is not None:
-                            dist = math.hypot(dx - ax, dy - ay)
-                            if dist == 0:
-                                px, py = ax, ay
-                            else:
-                                px = ax + (dx - ax) / dist * PARTICLE_DISTANCE
-                                py = ay + (dy - ay) / dist * PARTICLE_DISTANCE
-                            self.particle_shot.addParticle((px, py))
-                        if self.particle_arrow is not None:
-                            dist = math.hypot(dx - ax, dy - ay)
-                            if dist == 0:
-                                start = (ax, ay)
-                            else:
-                                start = (
-                                    ax + (dx - ax) / dist * PARTICLE_DISTANCE,
-                                    ay + (dy - ay) / dist * PARTICLE_DISTANCE,
-                                )
-                            self.particle_arrow.addParticle(start, (dx, dy))
-                        remove_indices.append(j)
-                    break
-        for j in sorted(set(remove_indices), reverse=True):
-            defender.ants.pop(j)
-        if remove_indices:
-            defender._invalidate_centroid_cache()
+        for i, j in targets:
+            ax, ay = self.ants[i]
+            dx, dy = defender.ants[j]
+            engaged_self.add(i)
+            engaged_other.add(j)
+            hit = random.random() < self.kill_probability
+            if hit:
+                if self.particle_shot is not None:
+                    dist = math.hypot(dx - ax, dy - ay)
+                    if dist == 0:
+                        px, py = ax, ay
+                    else:
+                        px = ax + (dx - ax) / dist * PARTICLE_DISTANCE
+                        py = ay + (dy - ay) / dist * PARTICLE_DISTANCE
+                    self.particle_shot.addParticle((px, py))
+                if self.particle_arrow is not None:
+                    dist = math.hypot(dx - ax, dy - ay)
+                    if dist == 0:
+                        start = (ax, ay)
+                    else:
+                        start = (
+                            ax + (dx - ax) / dist * PARTICLE_DISTANCE,
+                            ay + (dy - ay) / dist * PARTICLE_DISTANCE,
+                        )
+                    self.particle_arrow.addParticle(start, (dx, dy))
+                remove_indices.append(j)
+        defender.remove_ants(remove_indices)
         self.engaged.update(engaged_self)
         defender.engaged.update(engaged_other)
+        return remove_indices
+
+    def _attack_targets(self, defender, candidates=None):
+        """Return ``(i, j)`` pairs of each attacker and its target, by attacker.
+
+        An attacker keeps the unit it fought last time while that unit is
+        alive and within ``attack_range``; the others pick the lowest
+        indexed defender in range. ``candidates`` are ``(i, j)`` arrays of
+        the pairs in range of at least the attackers without a remembered
+        target, when already known; otherwise they are searched for those
+        attackers only.
+        """
+        points = np.asarray(self.ants, dtype=np.float64).reshape(-1, 2)
+        others = np.asarray(defender.ants, dtype=np.float64).reshape(-1, 2)
+        target = self._remembered_targets(defender, points, others)
+
+        searching = np.flatnonzero(target < 0)
+        if len(searching) and len(others):
+            if candidates is None:
+                i, j = self._attack_candidates(defender, searching, points, others)
+            else:
+                i, j = candidates
+            wanted = target[i] < 0
+            i, j = _first_targets(i[wanted], j[wanted])
+            target[i] = j
+
+        engaged = np.flatnonzero(target >= 0)
+        self._targets[defender] = (self.unit_ids[engaged], defender.unit_ids[target[engaged]])
+        return list(zip(engaged.tolist(), target[engaged].tolist()))
+
+    def _remembered_targets(self, defender, points, others):
+        """Return the index of each attacker's remembered target, or -1.
+
+        ``points`` and ``others`` are the positions of both swarms; targets
+        that died or left ``attack_range`` are forgotten.
+        """
+        self._ensure_unit_ids()
+        defender._ensure_unit_ids()
+        ids = self.unit_ids
+        other_ids = defender.unit_ids
+        target = np.full(len(points), -1, dtype=np.intp)
+        memory = self._targets.get(defender)
+        if memory is not None and len(memory[0]) and len(others):
+            attackers, targets = memory
+            k = np.minimum(np.searchsorted(attackers, ids), len(attackers) - 1)
+            remembered = attackers[k] == ids
+            j = np.minimum(np.searchsorted(other_ids, targets[k]), len(other_ids) - 1)
+            alive = remembered & (other_ids[j] == targets[k])
+            delta = points - others[j]
+            keep = alive & ((delta * delta).sum(axis=1) <= self.attack_range * self.attack_range)
+            target[keep] = j[keep]
+        return target
+
+    def _attack_candidates(self, defender, searching, points, others):
+        """Return ``(i, j)`` arrays pairing the attackers at ``searching``
+        with the defenders in range."""
+        i, j = neighbor_pairs(points[searching], self.attack_range, others)
+        delta = points[searching][i] - others[j]
+        close = (delta * delta).sum(axis=1) <= self.attack_range * self.attack_range
+        return searching[i[close]], j[close]
+
+    def _is_opponent(self, stage):
+        """Return True if this swarm fights ``stage`` on collision."""
+        return not self.owner or self.owner.isEnemy(stage)
 
     def onCollision(self, stage):
         """Record collisions and resolve combat with enemy swarms."""
-        if self.owner:
-            if self.owner.isEnemy(stage):
-                self.colliding_swarms.append(stage)
-                self._attack(stage)
-        else:
+        if self._is_opponent(stage):
             self.colliding_swarms.append(stage)
             self._attack(stage)
 
+    def onMutualCollision(self, stage):
+        """Resolve combat between two swarms from one search for unit pairs.
+
+        The outcome is the one of calling both :meth:`onCollision` handlers
+        in turn: this swarm strikes first and ``stage`` strikes back with its
+        surviving units. Attackers of either side that kept their remembered
+        target are left out of the search; the others pick their targets
+        from the pairs found within the larger of the two attack ranges.
+        """
+        if not isinstance(stage, Swarm):
+            super().onMutualCollision(stage)
+            return
+        first = self._is_opponent(stage)
+        second = stage._is_opponent(self)
+        if not (first or second):
+            return
+        radius = max(
+            self.attack_range if first else 0,
+            stage.attack_range if second else 0,
+        )
+        points = np.asarray(self.ants, dtype=np.float64).reshape(-1, 2)
+        others = np.asarray(stage.ants, dtype=np.float64).reshape(-1, 2)
+        # Units of this swarm do not die in its own strike, so the targets
+        # ``stage`` keeps are already known for its survivors
+        mine = theirs = np.empty(0, dtype=np.intp)
+        if first:
+            mine = np.flatnonzero(self._remembered_targets(stage, points, others) < 0)
+        if second:
+            theirs = np.flatnonzero(stage._remembered_targets(self, others, points) < 0)
+        i, j, d2 = self._unit_pairs(points, others, radius, mine, theirs)
+        if first:
+            self.colliding_swarms.append(stage)
+            within = d2 <= self.attack_range * self.attack_range
+            removed = self._attack(stage, self._attack_targets(stage, (i[within], j[within])))
+            if removed:
+                # Drop the pairs of defenders that died and renumber the rest
+                removed = np.unique(removed)
+                alive = ~np.isin(j, removed)
+                i, d2 = i[alive], d2[alive]
+                j = j[alive] - np.searchsorted(removed, j[alive])
+        if second:
+            stage.colliding_swarms.append(self)
+            within = d2 <= stage.attack_range * stage.attack_range
+            stage._attack(self, stage._attack_targets(self, (j[within], i[within])))
+
+    @staticmethod
+    def _unit_pairs(points, others, radius, mine, theirs):
+        """Return arrays ``(i, j, d2)`` of pairs closer than ``radius``.
+
+        Only pairs of a unit ``i`` of ``points`` listed in ``mine`` or a unit
+        ``j`` of ``others`` listed in ``theirs`` are searched for.
+        """
+        i, j = neighbor_pairs(points[mine], radius, others)
+        i = mine[i]
+        back_j, back_i = neighbor_pairs(others[theirs], radius, points)
+        back_j = theirs[back_j]
+        # Pairs between two searching units were found from both sides
+        once = ~np.isin(back_i, mine)
+        i = np.concatenate([i, back_i[once]])
+        j = np.concatenate([j, back_j[once]])
+        delta = points[i] - others[j]
+        d2 = (delta * delta).sum(axis=1)
+        close = d2 <= radius * radius
+        return i[close], j[close], d2[close]
+
     def first_flag(self):
         return self.queue[0] if self.queue else None
 
     def _on_queue_change(self):
-        self.invalidate_flow_field()
-
-    def invalidate_flow_field(self):
-        self._flow_field_dirty = True
-        self._flow_field = None
+        # Only a new head flag changes where the swarm is heading; flags
+        # appended or removed behind it just refresh the prefetched fields.
+        head = self.first_flag()
+        if head is not self._queue_head:
+            self._queue_head = head
+            self.invalidate_flow_field()
+        self._prefetch_flow_fields()
+
+    def invalidate_flow_field(self, stage=None):
+        """Mark the flow field as outdated.
+
+        ``stage`` is an obstacle that was removed from the map. The current
+        field then stays in use until a repair that only clears the cells it
+        covered has finished; without ``stage`` the field is dropped.
+        """
+        if stage is not None:
+            shape = self._obstacle_shape(stage)
+            if shape is not None:
+                self._flow_field_removed.append((self._obstacle_version(), shape))
+                return
+        with self._flow_field_lock:
+            self._flow_field = None
+            self._flow_field_live_key = None
+            self._flow_field_wanted_key = None
+            self._flow_field_removed = []
 
     def _update_flow_field(self):
         flag = self.first_flag()
         if not flag or flag.pos is None:
-            self._flow_field = None
-            self._flow_field_flag = None
-            self._flow_field_dirty = False
+            self.flow_field_scheduler.cancel(self)
+            with self._flow_field_lock:
+                self._flow_field = None
+                self._flow_field_live_key = None
+                self._flow_field_wanted_key = None
+            return
+        if self.line_of_sight and self._path_is_clear(flag):
+            # Nothing in the way: seek the flag directly without a field
+            self.flow_field_scheduler.cancel(self)
+            with self._flow_field_lock:
+                self._flow_field = None
+                self._flow_field_live_key = None
+                self._flow_field_wanted_key = None
+            return
+        key = self._flow_field_key(flag)
+        if key == self._flow_field_live_key:
+            self._extend_flow_field(key)
+            return
+        if key == self._flow_field_wanted_key:
             return
+        # Flags moved in place and obstacle changes keep the current field
+        # steering until its replacement is published.
+        self._flow_field_wanted_key = key
+        cached = self.flow_field_cache.get(key)
+        if cached is not None:
+            self.flow_field_scheduler.cancel(self)
+            self._publish_flow_field(key, cached)
+            self._extend_flow_field(key)
+            self._prefetch_flow_fields()
+            return
+
+        goal = flag.pos
+        bounds = self._flow_field_bounds()
+        obstacles = self._get_obstacle_shapes()
+        live = self._flow_field
+        live_key = self._flow_field_live_key
+        removed = [shape for _, shape in self._flow_field_removed]
+        cache = self.flow_field_cache
         if (
-            self._flow_field is None
-            or self._flow_field_flag is not flag
-            or self._flow_field_dirty
+            self.flow_field_planner is None
+            and live is not None
+            and live_key is not None
+            and live.complete
+            and removed
+            and live_key._replace(obstacle_version=None) == key._replace(obstacle_version=None)
         ):
-            if not (self._flow_field_thread and self._flow_field_thread.is_alive()):
-                self._flow_field_flag = flag
+            def compute():
+                ff = live.repaired(removed, obstacles)
+                cache.put(key, ff)
+                return ff
+        else:
+            coarse_sizes = self.flow_field_coarse_sizes
+            if self.flow_field_planner is not None:
+                coarse_sizes = ()
+            layout = self._obstacle_layout()
+            blocked = self._obstacle_mask()
+            if coarse_sizes:
+                self._publish_provisional(
+                    key, self._compute_provisional(goal, obstacles, coarse_sizes[0])
+                )
+
+            def compute():
+                for size in coarse_sizes[1:]:
+                    self._publish_provisional(
+                        key, self._compute_provisional(goal, obstacles, size)
+                    )
+                ff = self._compute_flow_field(
+                    goal, obstacles, bounds, layout=layout, blocked=blocked
+                )
+                cache.put(key, ff)
+                return ff
+        self.flow_field_scheduler.submit(
+            self,
+            key,
+            compute,
+            lambda ff: self._publish_flow_field(key, ff),
+            errback=lambda error: self._forget_flow_field(key),
+        )
+        self._prefetch_flow_fields(obstacles)
+
+    def _prefetch_flow_fields(self, obstacles=None):
+        """Compute fields for the flags queued behind the head into the cache.
+
+        Waypoint transitions then find the next field ready instead of
+        steering in a straight line until it arrives.
+        """
+        scheduler = self.flow_field_scheduler
+        cache = self.flow_field_cache
+        flags = list(self.queue)[1:1 + self.flow_field_prefetch]
+        for slot in range(self.flow_field_prefetch):
+            owner = (self, slot)
+            flag = flags[slot] if slot < len(flags) else None
+            if flag is None or flag.pos is None:
+                scheduler.cancel(owner)
+                continue
+            key = self._flow_field_key(flag)
+            if key in cache or scheduler.pending(owner) == key:
+                continue
+            if obstacles is None:
                 obstacles = self._get_obstacle_shapes()
-                self._flow_field_thread = threading.Thread(
-                    target=self._run_flow_field_compute,
-                    args=(flag, obstacles),
-                    daemon=True,
+
+            def compute(
+                goal=flag.pos,
+                obstacles=obstacles,
+                key=key,
+                bounds=self._flow_field_bounds(),
+                layout=self._obstacle_layout(),
+                blocked=self._obstacle_mask(),
+            ):
+                ff = self._compute_flow_field(
+                    goal, obstacles, bounds, layout=layout, blocked=blocked
                 )
-                self._flow_field_thread.start()
+                cache.put(key, ff)
+                return ff
+
+            scheduler.submit(owner, key, compute, lambda ff: None, urgent=False)
+
+    def _path_is_clear(self, flag):
+        """Return True if no obstacle lies between the swarm and ``flag``.
 
-    def _run_flow_field_compute(self, flag, obstacles):
-        ff = FlowField(self.width, self.height)
-        ff.compute(flag.pos, obstacles, margin=5.0)
+        The segment from the centroid to the flag is inflated by the swarm's
+        spread plus the flow field margin, so every unit can seek the flag
+        in a straight line. The answer is reused while the centroid, flag
+        and obstacles stay the same, e.g. across the units of one tick.
+        """
+        center = self.compute_centroid()
+        if center is None:
+            return False
+        inputs = (center, tuple(flag.pos), self._spread, self._obstacle_version())
+        if self._line_of_sight is not None and self._line_of_sight[0] == inputs:
+            return self._line_of_sight[1]
+        radius = self._spread + FLOW_FIELD_MARGIN
+        clear = not any(
+            shape.intersectsSegment(center, flag.pos, radius)
+            for shape in self._get_obstacle_shapes()
+        )
+        self._line_of_sight = (inputs, clear)
+        return clear
+
+    def _flow_field_key(self, flag):
+        """Return the shared cache key of the flow field towards ``flag``."""
+        cell_size = self.flow_cell_size
+        engine = self.flow_field_engine
+        if self.flow_field_planner is not None:
+            cell_size = self.flow_field_planner.cell_size
+            engine = "hierarchical"
+        return self.flow_field_cache.key(
+            self.width,
+            self.height,
+            cell_size,
+            flag.pos,
+            self._obstacle_version(),
+            FLOW_FIELD_MARGIN,
+            engine,
+            bounded=self.flow_field_planner is None and self.flow_field_bounds_margin is not None,
+        )
+
+    def _flow_field_bounds(self):
+        """Return the area a bounded field must cover or ``None``."""
+        if self.flow_field_bounds_margin is None:
+            return None
+        bounds = self.get_bounds()
+        if bounds is None:
+            return None
+        margin = self.flow_field_bounds_margin
+        return (bounds[0] - margin, bounds[1] - margin, bounds[2] + margin, bounds[3] + margin)
+
+    def _extend_flow_field(self, key):
+        """Grow a bounded live field once units leave its settled area.
+
+        An extension that failed is not retried until the area needed
+        changes.
+        """
+        live = self._flow_field
+        bounds = self._flow_field_bounds()
+        if live is None or live.complete or bounds is None:
+            return
+        rect = live._cell_rect(bounds)
+        if self._flow_field_covered == (live, rect) or live.covers(bounds):
+            self._flow_field_covered = (live, rect)
+            return
+        job = (key, rect)
+        if job in (self.flow_field_scheduler.pending(self), self._flow_field_extend_failed):
+            return
+        cache = self.flow_field_cache
+
+        def compute():
+            # Extend a copy: the live field may be sampled meanwhile
+            ff = live.copy()
+            ff.extend(bounds)
+            cache.put(key, ff)
+            return ff
+
+        def failed(error):
+            self._flow_field_extend_failed = job
+
+        self.flow_field_scheduler.submit(
+            self, job, compute, lambda ff: self._publish_flow_field(key, ff), errback=failed
+        )
+
+    def _compute_flow_field(
+        self, goal, obstacles, bounds=None, cell_size=None, layout=None, blocked=None
+    ):
+        """Return a new field towards ``goal``; runs in a scheduler thread.
+
+        With a store and the obstacle ``layout`` hash, stored fields are
+        loaded instead of computed and complete new ones are saved. Fields
+        computed in a process pool are always complete. With a planner the
+        field is a :class:`HierarchicalField` instead, planned on the portal
+        graph of ``layout``. ``blocked`` is the
+        obstacle mask of the full resolution field from
+        :meth:`_obstacle_mask`, if any.
+        """
+        if self.flow_field_planner is not None:
+            return self.flow_field_planner.field_to(
+                goal, obstacles, FLOW_FIELD_MARGIN, layout=layout
+            )
+        if cell_size is None:
+            cell_size = self.flow_cell_size
+        store = self.flow_field_store
+        if store is None or layout is None:
+            return self._compute_new_flow_field(goal, obstacles, bounds, cell_size, blocked)
+        store_key = store.key(
+            layout,
+            self.width,
+            self.height,
+            cell_size,
+            goal,
+            FLOW_FIELD_MARGIN,
+            self.flow_field_engine,
+        )
+        ff = store.load(store_key, self.width, self.height, cell_size, self.flow_field_engine)
+        if ff is None:
+            ff = self._compute_new_flow_field(goal, obstacles, bounds, cell_size, blocked)
+            store.save(store_key, ff)
+        return ff
+
+    def _compute_new_flow_field(self, goal, obstacles, bounds, cell_size, blocked=None):
+        if self.flow_field_pool is not None:
+            return self.flow_field_pool.submit(
+                self.width,
+                self.height,
+                cell_size,
+                self.flow_field_engine,
+                goal,
+                obstacles,
+                FLOW_FIELD_MARGIN,
+            ).result()
+        ff = FlowField(
+            self.width,
+            self.height,
+            cell_size=cell_size,
+            engine=self.flow_field_engine,
+        )
+        ff.compute(goal, obstacles, margin=FLOW_FIELD_MARGIN, bounds=bounds, blocked=blocked)
+        return ff
+
+    def _compute_provisional(self, goal, obstacles, cell_size):
+        """Return a coarse field towards ``goal`` computed in this thread.
+
+        The first one is computed on the game thread, so provisional fields
+        never wait for the process pool or touch the store.
+        """
+        ff = FlowField(
+            self.width,
+            self.height,
+            cell_size=cell_size,
+            engine=self.flow_field_engine,
+        )
+        ff.compute(goal, obstacles, margin=FLOW_FIELD_MARGIN)
+        return ff
+
+    def _publish_provisional(self, key, ff):
+        """Steer with the coarse field ``ff`` until the field ``key`` is ready.
+
+        Coarse cells close narrow gaps, so a field that cannot reach the
+        swarm is not used.
+        """
+        center = self.compute_centroid()
+        if center is None or ff.get_distance(center) == ff.INF:
+            return
         with self._flow_field_lock:
-            if self._flow_field_flag is flag:
+            if key == self._flow_field_wanted_key and key != self._flow_field_live_key:
                 self._flow_field = ff
-                self._flow_field_dirty = False
+                self._flow_field_live_key = None
+
+    def _publish_flow_field(self, key, ff):
+        """Make ``ff`` the live field if it is still the one wanted."""
+        with self._flow_field_lock:
+            if key != self._flow_field_wanted_key:
+                return
+            self._flow_field = ff
+            self._flow_field_live_key = key
+            self._flow_field_removed = [
+                entry for entry in self._flow_field_removed
+                if entry[0] > key.obstacle_version
+            ]
+
+    def _forget_flow_field(self, key):
+        """Let the next update request the field ``key`` again after it failed."""
+        with self._flow_field_lock:
+            if key == self._flow_field_wanted_key:
+                self._flow_field_wanted_key = None
 
     def is_fast_moving(self):
         """Return True if the active flag is a FastFlag."""
@@ -384,14 +1035,16 @@ class Swarm(Stage):
         width = self.width if width is None else width
         height = self.height if height is None else height
         min_distance = self.min_distance if min_distance is None else min_distance
-        while len(self.ants) < count:
+        placed = []
+        while len(self.ants) + len(placed) < count:
             x = random.uniform(*x_range)
             y = random.uniform(*y_range)
             if 0 <= x < width and 0 <= y < height:
                 if all((x - ox) ** 2 + (y - oy) ** 2 >= min_distance ** 2 for ox, oy in occupied):
-                    self.ants.append([x, y])
-                    self._invalidate_centroid_cache()
+                    placed.append([x, y])
                     occupied.add((x, y))
+        if placed:
+            self._append_ants(placed)
 
     def _draw(self, screen):
         draw_ants(
@@ -403,7 +1056,14 @@ class Swarm(Stage):
             self.shape,
             getattr(self, "orientations", None),
         )
-        draw_group_banner(screen, self.ants, self.color, self.group_id, self.active)
+        draw_group_banner(
+            screen,
+            self.ants,
+            self.color,
+            self.group_id,
+            self.active,
+            center=self.compute_centroid(),
+        )
         if self.queue:
             start_center = self.compute_centroid()
             if start_center:
@@ -419,32 +1079,82 @@ class Swarm(Stage):
     # ------------------------------------------------------------------
     # Movement helpers
     # ------------------------------------------------------------------
-    def _get_obstacle_shapes(self):
+    def _get_root(self):
         root = self
         while getattr(root, "_parent", None) is not None:
             root = root._parent
-        destructibles = getattr(root, "destructibles", None)
+        return root
+
+    def _get_destructibles(self):
+        return getattr(self._get_root(), "destructibles", None)
+
+    def _obstacle_version(self):
+        """Return the version of the obstacle set or ``None`` without one."""
+        destructibles = self._get_destructibles()
+        if destructibles is None:
+            return None
+        return destructibles.version
+
+    def _obstacle_layout(self):
+        """Return the obstacle layout hash or ``None`` without obstacles."""
+        destructibles = self._get_destructibles()
+        if destructibles is None:
+            return None
+        return destructibles.layout_hash()
+
+    def _obstacle_mask(self):
+        """Return the flow field obstacle mask read off the clearance field.
+
+        ``None`` when there are no obstacles or the field cannot provide the
+        mask at this cell size, in which case obstacles are rasterized.
+        """
+        destructibles = self._get_destructibles()
+        if destructibles is None or (self.width, self.height) != (
+            destructibles.width,
+            destructibles.height,
+        ):
+            return None
+        return destructibles.blocked_mask(self.flow_cell_size, FLOW_FIELD_MARGIN)
+
+    def _get_obstacle_shapes(self):
+        destructibles = self._get_destructibles()
         shapes = []
         if destructibles:
             for tree in getattr(destructibles, "trees", []):
-                shape = tree.getCollisionShape()
+                shape = self._obstacle_shape(tree)
                 if shape is not None:
                     shapes.append(shape)
         return shapes
 
+    @staticmethod
+    def _obstacle_shape(stage):
+        """Return the shape ``stage`` blocks, ignoring any shake from hits.
+
+        Fields, their repairs and the clearance field then all see trees at
+        their base position.
+        """
+        base = getattr(stage, "base_pos", None)
+        if base is None:
+            return stage.getCollisionShape()
+        return CollisionShape(base, stage.size)
+
     def _is_valid_position(self, x, y, others):
         if not (0 <= x < self.width and 0 <= y < self.height):
             return False
         for ox, oy in others:
             if (x - ox) ** 2 + (y - oy) ** 2 < self.min_distance ** 2:
                 return False
-        ant_shape = CollisionShape((x, y), self.min_distance / 2)
-        for shape in self._get_obstacle_shapes():
-            if ant_shape.collidesWith(shape):
-                return False
+        destructibles = self._get_destructibles()
+        if destructibles is not None and destructibles.blocks(x, y, self.min_distance / 2):
+            return False
         return True
 
-    def _compute_move_vector(self, x, y, flag_pos, others):
+    def _compute_move_vector(self, x, y, flag_pos, others, flow=None):
+        """Return the unit step for the ant at ``(x, y)``.
+
+        ``flow`` is the flow field vector at the ant, or ``None`` to seek
+        ``flag_pos`` directly.
+        """
         ex = ey = 0.0
         for ox, oy in others:
             dx = x - ox
@@ -471,10 +1181,8 @@ class Swarm(Stage):
         rx = math.cos(angle) * mag
         ry = math.sin(angle) * mag
 
-        ux = uy = 0.0
-        self._update_flow_field()
-        if self._flow_field is not None:
-            ux, uy = self._flow_field.get_vector((x, y))
+        if flow is not None:
+            ux, uy = flow
             vx = ex + rx + ux
             vy = ey + ry + uy
         else :
@@ -499,6 +1207,14 @@ class Swarm(Stage):
         return best_flag
 
     def _propose_moves(self, ants, flags, all_ants, tick):
+        # Bucket the swarm once per tick so separation only looks at
+        # ants in the neighbouring cells instead of the whole swarm.
+        grid = SpatialHash(self.min_distance, all_ants)
+        # Sample the flow field for the whole swarm in one call
+        self._update_flow_field()
+        flows = None
+        if self._flow_field is not None and len(ants):
+            flows = self._flow_field.get_vectors(ants).tolist()
         proposed = []
         for i, (x, y) in enumerate(ants):
             flag = self._nearest_flag(x, y, flags)
@@ -506,7 +1222,10 @@ class Swarm(Stage):
                 proposed.append((x, y))
                 continue
             target_pos = flag.pos
-            vx, vy = self._compute_move_vector(x, y, target_pos, all_ants)
+            vx, vy = self._compute_move_vector(
+                x, y, target_pos, grid.neighbors(x, y),
+                flows[i] if flows is not None else None,
+            )
             nx = max(0, min(self.width - 1, x + vx * tick))
             ny = max(0, min(self.height - 1, y + vy * tick))
             proposed.append((nx, ny))
@@ -514,16 +1233,110 @@ class Swarm(Stage):
 
     def _resolve_positions(self, ants, proposed):
         new_ants = []
-        occupied_new = []
+        occupied_new = SpatialHash(self.min_distance)
         for i, (nx, ny) in enumerate(proposed):
-            if self._is_valid_position(nx, ny, occupied_new):
+            if self._is_valid_position(nx, ny, occupied_new.neighbors(nx, ny)):
                 new_ants.append((nx, ny))
-                occupied_new.append((nx, ny))
+                occupied_new.insert(nx, ny)
             else:
-                new_ants.append(tuple(ants[i]))
-                occupied_new.append(tuple(ants[i]))
+                x, y = ants[i]
+                new_ants.append((x, y))
+                occupied_new.insert(x, y)
         return new_ants
 
+    # ------------------------------------------------------------------
+    # Vectorized movement helpers
+    # ------------------------------------------------------------------
+    def _nearest_flag_positions(self, positions, flags):
+        """Return the nearest flag position per ant or ``None`` without flags."""
+        targets = [flag.pos for flag in flags if flag.pos is not None]
+        if not targets:
+            return None
+        targets = np.asarray(targets, dtype=np.float64)
+        if len(targets) == 1:
+            return np.broadcast_to(targets[0], positions.shape)
+        d2 = ((positions[:, None, :] - targets[None, :, :]) ** 2).sum(axis=2)
+        return targets[d2.argmin(axis=1)]
+
+    def _separation_vectors(self, positions):
+        """Return the summed unit vectors pushing each ant away from close neighbours."""
+        separation = np.zeros_like(positions)
+        i, j = neighbor_pairs(positions, self.min_distance)
+        delta = positions[i] - positions[j]
+        d2 = (delta * delta).sum(axis=1)
+        close = (d2 > 0) & (d2 < self.min_distance ** 2)
+        i = i[close]
+        delta = delta[close] / np.sqrt(d2[close])[:, None]
+        n = len(positions)
+        separation[:, 0] = np.bincount(i, weights=delta[:, 0], minlength=n)
+        separation[:, 1] = np.bincount(i, weights=delta[:, 1], minlength=n)
+        return separation
+
+    def _propose_moves_array(self, ants, flags, tick):
+        """Vectorized counterpart of :meth:`_propose_moves`."""
+        positions = np.asarray(ants, dtype=np.float64).reshape(-1, 2)
+        n = len(positions)
+        targets = self._nearest_flag_positions(positions, flags)
+        if targets is None or n == 0:
+            return positions
+
+        seek = targets - positions
+        seek_len = np.hypot(seek[:, 0], seek[:, 1])
+        moving = seek_len != 0
+        seek[moving] /= seek_len[moving, None]
+        seek[~moving] = 0.0
+
+        angle = np.random.uniform(0, 2 * math.pi, n)
+        mag = np.where(
+            np.random.random(n) < 0.1,
+            np.random.uniform(0.5, 3.0, n),
+            np.random.uniform(0.1, 0.6, n),
+        )
+        noise = np.column_stack((np.cos(angle) * mag, np.sin(angle) * mag))
+
+        velocity = self._separation_vectors(positions) + noise
+        self._update_flow_field()
+        flow_field = self._flow_field
+        if flow_field is not None:
+            velocity += flow_field.get_vectors(positions)
+        else:
+            velocity += seek
+
+        vlen = np.hypot(velocity[:, 0], velocity[:, 1])
+        nonzero = vlen != 0
+        velocity[nonzero] /= vlen[nonzero, None]
+        velocity[~nonzero] = 0.0
+
+        proposed = positions + velocity * tick
+        np.clip(proposed[:, 0], 0, self.width - 1, out=proposed[:, 0])
+        np.clip(proposed[:, 1], 0, self.height - 1, out=proposed[:, 1])
+        return proposed
+
+    def _resolve_positions_array(self, ants, proposed):
+        """Vectorized counterpart of :meth:`_resolve_positions`.
+
+        A move is rejected when it leaves the field, touches an obstacle or
+        lands closer than ``min_distance`` to the proposed position of an
+        earlier ant; rejected ants keep their current position.
+        """
+        current = np.asarray(ants, dtype=np.float64).reshape(-1, 2)
+        x = proposed[:, 0]
+        y = proposed[:, 1]
+        valid = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+
+        destructibles = self._get_destructibles()
+        if destructibles is not None:
+            valid &= ~destructibles.blocks_many(proposed, self.min_distance / 2)
+
+        i, j = neighbor_pairs(proposed, self.min_distance)
+        earlier = j < i
+        i = i[earlier]
+        delta = proposed[i] - proposed[j[earlier]]
+        crowded = (delta * delta).sum(axis=1) < self.min_distance ** 2
+        valid[i[crowded]] = False
+
+        return np.where(valid[:, None], proposed, current)
+
     def _maybe_fire_bullet(self):
         """Hook for subclasses to optionally fire a cannon bullet."""
         return
@@ -537,9 +1350,12 @@ class Swarm(Stage):
 
         all_ants = self.ants
         speed = dt * 1.5 if isinstance(flag, FastFlag) else dt
-        proposed = self._propose_moves(self.ants, flags, all_ants, speed)
-        self.ants = [list(p) for p in self._resolve_positions(self.ants, proposed)]
-        self._invalidate_centroid_cache()
+        if self.vectorized:
+            proposed = self._propose_moves_array(self.ants, flags, speed)
+            self.ants = self._resolve_positions_array(self.ants, proposed)
+        else:
+            proposed = self._propose_moves(self.ants, flags, all_ants, speed)
+            self.ants = [list(p) for p in self._resolve_positions(self.ants, proposed)]
 
         center = self.compute_centroid()
         if flag and flag.pos is not None and center is not None:
@@ -566,6 +1382,7 @@ class SwarmFootmen(Swarm):
         kill_probability=KILL_PROBABILITY,
         owner=None,
         show_particles=True,
+        **kwargs,
     ):
         super().__init__(
             color,
@@ -580,6 +1397,7 @@ class SwarmFootmen(Swarm):
             owner=owner,
             show_particles=show_particles,
             arrow_particles=False,
+            **kwargs,
         )
 
 
@@ -598,6 +1416,7 @@ class SwarmArchers(Swarm):
         kill_probability=ARCHER_KILL_PROBABILITY,
         owner=None,
         show_particles=False,
+        **kwargs,
     ):
         super().__init__(
             color,
@@ -612,6 +1431,7 @@ class SwarmArchers(Swarm):
             owner=owner,
             show_particles=show_particles,
             arrow_particles=True,
+            **kwargs,
         )
 
 
@@ -629,6 +1449,7 @@ class SwarmCannon(Swarm):
         height=480,
         min_distance=4,
         owner=None,
+        **kwargs,
         ):
         super().__init__(
             color,
@@ -643,16 +1464,34 @@ class SwarmCannon(Swarm):
             owner=owner,
             show_particles=False,
             arrow_particles=False,
+            **kwargs,
         )
-        self.orientations = []
+        self.orientations = self._new_orientations(0)
+
+    def _new_orientations(self, count):
+        """Return ``count`` zero orientations in the swarm's storage format."""
+        if self.vectorized:
+            return np.zeros(count, dtype=np.float32)
+        return [0.0] * count
 
     def spawn(self, count, x_range, y_range, occupied, width=None, height=None, min_distance=None):
         super().spawn(count, x_range, y_range, occupied, width, height, min_distance)
-        self.orientations = [0.0 for _ in self.ants]
+        self.orientations = self._new_orientations(len(self.ants))
+
+    def remove_ants(self, indices):
+        """Remove units together with their orientations."""
+        indices = sorted(set(indices), reverse=True)
+        tracked = [j for j in indices if j < len(self.orientations)]
+        if self.vectorized:
+            self.orientations = np.delete(self.orientations, tracked)
+        else:
+            for j in tracked:
+                self.orientations.pop(j)
+        super().remove_ants(indices)
 
-    def _attack(self, defender):
+    def _attack(self, defender, targets=None):
         """Cannons do not attack."""
-        return
+        return []
 
     def _maybe_fire_bullet(self):
         """Fire at a random enemy swarm within range occasionally."""
@@ -678,9 +1517,15 @@ class SwarmCannon(Swarm):
 
     def _tick(self, dt):
         # Ensure orientation list matches current ants
+        missing = len(self.ants) - len(self.orientations)
         self.orientations = self.orientations[: len(self.ants)]
-        if len(self.orientations) < len(self.ants):
-            self.orientations.extend([0.0] * (len(self.ants) - len(self.orientations)))
+        if missing > 0:
+            if self.vectorized:
+                self.orientations = np.concatenate(
+                    [self.orientations, self._new_orientations(missing)]
+                )
+            else:
+                self.orientations.extend(self._new_orientations(missing))
 
         flag = self.first_flag()
         flags = [flag] if flag else []
@@ -688,22 +1533,30 @@ class SwarmCannon(Swarm):
         speed = dt * self.BASE_SPEED
         if isinstance(flag, FastFlag):
             speed *= 1.5
-        proposed = self._propose_moves(self.ants, flags, all_ants, speed)
-        resolved = self._resolve_positions(self.ants, proposed)
-
-        new_orientations = []
-        for (nx, ny), ori in zip(resolved, self.orientations):
-            nearest = self._nearest_flag(nx, ny, flags)
-            if nearest and nearest.pos is not None:
-                dx = nearest.pos[0] - nx
-                dy = nearest.pos[1] - ny
-                new_orientations.append(math.atan2(dy, dx))
-            else:
-                new_orientations.append(ori)
-
-        self.ants = [list(p) for p in resolved]
-        self.orientations = new_orientations
-        self._invalidate_centroid_cache()
+        if self.vectorized:
+            proposed = self._propose_moves_array(self.ants, flags, speed)
+            resolved = self._resolve_positions_array(self.ants, proposed)
+            targets = self._nearest_flag_positions(resolved, flags)
+            if targets is not None and len(resolved):
+                delta = targets - resolved
+                self.orientations = np.arctan2(delta[:, 1], delta[:, 0]).astype(np.float32)
+            self.ants = resolved
+        else:
+            proposed = self._propose_moves(self.ants, flags, all_ants, speed)
+            resolved = self._resolve_positions(self.ants, proposed)
+
+            new_orientations = []
+            for (nx, ny), ori in zip(resolved, self.orientations):
+                nearest = self._nearest_flag(nx, ny, flags)
+                if nearest and nearest.pos is not None:
+                    dx = nearest.pos[0] - nx
+                    dy = nearest.pos[1] - ny
+                    new_orientations.append(math.atan2(dy, dx))
+                else:
+                    new_orientations.append(ori)
+
+            self.ants = [list(p) for p in resolved]
+            self.orientations = new_orientations
 
         center = self.compute_centroid()
         if flag and flag.pos is not None and center is not None:
@@ -0,0 +1,72 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+pytest.importorskip('pygame')
+pytest.importorskip('numpy')
+
+from swarm import Swarm
+
+
+def _swarm(ants, vectorized):
+    swarm = Swarm(
+        (255, 0, 0), 1, (255, 100, 100), width=100, height=100,
+        attack_range=12, vectorized=vectorized,
+    )
+    swarm.kill_probability = 0.0
+    swarm.ants = ants
+    return swarm
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_unit_ids_are_stable(vectorized):
+    swarm = _swarm([[0, 0], [1, 1], [2, 2]], vectorized)
+    ids = swarm.unit_ids.tolist()
+    swarm.ants = [[5, 5], [6, 6], [7, 7]]
+    assert swarm.unit_ids.tolist() == ids
+    swarm.remove_ants([1])
+    assert swarm.unit_ids.tolist() == [ids[0], ids[2]]
+    swarm._append_ants([[9, 9]])
+    assert swarm.unit_ids.tolist()[:2] == [ids[0], ids[2]]
+    assert swarm.unit_ids[2] > ids[2]
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_attackers_keep_their_target(vectorized):
+    attacker = _swarm([[50, 50]], vectorized)
+    defender = _swarm([[80, 50], [55, 50]], vectorized)
+    assert attacker._attack_targets(defender) == [(0, 1)]
+
+    # A lower indexed defender coming into range does not steal the attack
+    defender.ants = [[52, 50], [55, 50]]
+    assert attacker._attack_targets(defender) == [(0, 1)]
+
+    # Leaving the range or dying ends the engagement
+    defender.ants = [[52, 50], [70, 50]]
+    assert attacker._attack_targets(defender) == [(0, 0)]
+    defender.ants = [[52, 50], [55, 50]]
+    assert attacker._attack_targets(defender) == [(0, 0)]
+    defender.remove_ants([0])
+    assert attacker._attack_targets(defender) == [(0, 0)]
+    defender.remove_ants([0])
+    assert attacker._attack_targets(defender) == []
+
+
+def test_units_appended_directly_get_ids():
+    attacker = _swarm([[50, 50], [52, 50]], False)
+    defender = _swarm([[55, 50], [57, 50]], False)
+    attacker._attack(defender)
+    defender._attack(attacker)
+    attacker.ants.append([60, 50])
+    defender.ants.append([62, 50])
+    assert len(attacker._attack(defender)) == 0
+    assert attacker.engaged == {0, 1, 2}
+    assert len(attacker.unit_ids) == 3
+    assert len(set(attacker.unit_ids.tolist())) == 3
+
+    defender.ants.pop()
+    targets = attacker._attack_targets(defender)
+    assert [i for i, _ in targets] == [0, 1, 2]
+    assert all(j < 2 for _, j in targets)
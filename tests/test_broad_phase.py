@@ -0,0 +1,52 @@
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from stage import Stage
+from collision_shape import CollisionShape, sweep_and_prune
+
+
+class CountingStage(Stage):
+    def __init__(self, shape):
+        super().__init__()
+        self.shape = shape
+        self.shape_calls = 0
+        self.hits = []
+
+    def getCollisionShape(self):
+        self.shape_calls += 1
+        return self.shape
+
+    def onCollision(self, stage):
+        self.hits.append(stage)
+
+
+def test_sweep_and_prune_keeps_all_colliding_pairs():
+    random.seed(2)
+    shapes = [
+        CollisionShape((random.uniform(0, 200), random.uniform(0, 200)), random.uniform(1, 15))
+        for _ in range(60)
+    ]
+    candidates = set(sweep_and_prune(shapes))
+    for i in range(len(shapes)):
+        for j in range(i + 1, len(shapes)):
+            if shapes[i].collidesWith(shapes[j]):
+                assert (i, j) in candidates
+
+
+def test_sweep_and_prune_skips_separated_intervals():
+    shapes = [CollisionShape((0, 0), 1), CollisionShape((10, 0), 1), CollisionShape((1.5, 5), 1)]
+    assert sweep_and_prune(shapes) == [(0, 2)]
+
+
+def test_resolve_fetches_each_shape_once():
+    root = Stage()
+    stages = [CountingStage(CollisionShape((x * 5, 0), 3)) for x in range(6)]
+    for stage in stages:
+        root.add_stage(stage)
+    root._resolve_collisions()
+    assert all(stage.shape_calls == 1 for stage in stages)
+    assert stages[0].hits == [stages[1]]
+    assert stages[1].hits == [stages[0], stages[2]]
@@ -27,3 +27,13 @@ def test_swarm_collision_shape():
 def test_swarm_collision_shape_empty():
     swarm = Swarm((255, 0, 0), group_id=1, flag_color=(255, 100, 100), width=100, height=100)
     assert swarm.getCollisionShape() is None
+
+
+def test_intersects_segment():
+    shape = CollisionShape((10, 10), 2)
+    assert shape.intersectsSegment((0, 10), (20, 10))
+    assert not shape.intersectsSegment((0, 14), (20, 14))
+    assert shape.intersectsSegment((0, 14), (20, 14), radius=2)
+    # the closest point is an end of the segment
+    assert not shape.intersectsSegment((0, 0), (5, 5), radius=2)
+    assert shape.intersectsSegment((10, 10), (10, 10))
@@ -0,0 +1,66 @@
+import os
+import sys
+import math
+import random
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+pytest.importorskip('pygame')
+np = pytest.importorskip('numpy')
+
+from destructibles import Destructibles, Tree
+from flow_field import FlowField
+
+
+def _expected_clearance(destruct):
+    size = destruct.DISTANCE_CELL
+    expected = np.full((destruct.distance_h, destruct.distance_w), destruct.MAX_CLEARANCE)
+    for y in range(destruct.distance_h):
+        for x in range(destruct.distance_w):
+            for tree in destruct.trees:
+                bx, by = tree.base_pos
+                distance = math.hypot(x * size + size / 2 - bx, y * size + size / 2 - by)
+                expected[y, x] = min(expected[y, x], distance - tree.size)
+    return expected
+
+
+def test_clearance_is_patched_when_trees_change():
+    random.seed(2)
+    destruct = Destructibles(160, 120, num_trees=10)
+    assert np.allclose(destruct.clearance, _expected_clearance(destruct), atol=1e-4)
+
+    for tree in list(destruct.trees)[:6]:
+        destruct.remove_stage(tree)
+        assert np.allclose(destruct.clearance, _expected_clearance(destruct), atol=1e-4)
+    destruct.add_stage(Tree((80, 60), 12, owner=destruct))
+    assert np.allclose(destruct.clearance, _expected_clearance(destruct), atol=1e-4)
+
+    x, y = destruct.trees[-1].base_pos
+    assert destruct.clearance_at(x, y) < 0
+    assert destruct.clearance_many([(x, y), (x + 100, y)]).tolist()[0] < 0
+
+
+@pytest.mark.parametrize("margin", [0.0, 5.0, 11.5])
+def test_blocked_mask_matches_rasterized_obstacles(margin):
+    random.seed(7)
+    destruct = Destructibles(160, 120, num_trees=10)
+    ff = FlowField(160, 120, cell_size=destruct.DISTANCE_CELL)
+    shapes = [tree.getCollisionShape() for tree in destruct.trees]
+    blocked, _ = ff._rasterize_obstacles(shapes, margin)
+    assert destruct.blocked_mask(destruct.DISTANCE_CELL, margin) == blocked
+    assert destruct.blocked_mask(destruct.DISTANCE_CELL * 2, margin) is None
+
+
+@pytest.mark.parametrize("engine", FlowField.ENGINES)
+def test_field_from_mask_matches_rasterized_field(engine):
+    random.seed(7)
+    destruct = Destructibles(160, 120, num_trees=10)
+    shapes = [tree.getCollisionShape() for tree in destruct.trees]
+    mask = destruct.blocked_mask(destruct.DISTANCE_CELL, 5.0)
+    rasterized = FlowField(160, 120, cell_size=destruct.DISTANCE_CELL, engine=engine)
+    rasterized.compute((150, 110), shapes, margin=5.0)
+    masked = FlowField(160, 120, cell_size=destruct.DISTANCE_CELL, engine=engine)
+    masked.compute((150, 110), [], margin=5.0, blocked=mask)
+    assert masked.blocked == rasterized.blocked
+    assert masked.costs == rasterized.costs
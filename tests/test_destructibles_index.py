@@ -0,0 +1,44 @@
+import os
+import sys
+import random
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+pytest.importorskip('pygame')
+
+from destructibles import Destructibles, Tree
+from collision_shape import CollisionShape
+
+
+def _brute_force(destruct, x, y, radius):
+    shape = CollisionShape((x, y), radius)
+    return any(shape.collidesWith(tree.getCollisionShape()) for tree in destruct.trees)
+
+
+def test_index_matches_brute_force():
+    random.seed(4)
+    destruct = Destructibles(200, 150, num_trees=12)
+    points = [(random.uniform(0, 200), random.uniform(0, 150)) for _ in range(2000)]
+    for radius in (0.0, 2.0, 7.0, 12.0):
+        expected = [_brute_force(destruct, x, y, radius) for x, y in points]
+        assert [destruct.blocks(x, y, radius) for x, y in points] == expected
+        assert destruct.blocks_many(points, radius).tolist() == expected
+
+
+def test_index_follows_added_and_removed_trees():
+    destruct = Destructibles(100, 100, num_trees=0)
+    assert not destruct.blocks(50, 50)
+    assert not destruct.occupancy.any()
+
+    tree = Tree((50, 50), 10, owner=destruct)
+    destruct.add_stage(tree)
+    assert destruct.blocks(50, 50)
+    assert destruct.blocks(61, 50, 2.0)
+    assert not destruct.blocks(63, 50, 2.0)
+    assert destruct.index_version == destruct.version
+
+    destruct.remove_stage(tree)
+    assert not destruct.blocks(50, 50)
+    assert not destruct.occupancy.any()
+    assert destruct.index_version == destruct.version
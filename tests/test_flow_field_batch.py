@@ -0,0 +1,35 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+np = pytest.importorskip('numpy')
+
+from flow_field import FlowField
+from collision_shape import CollisionShape
+
+
+OBSTACLES = [CollisionShape((60, 40), 10), CollisionShape((100, 70), 8)]
+
+
+@pytest.mark.parametrize("engine", FlowField.ENGINES)
+@pytest.mark.parametrize("cell_size", [1, 4])
+def test_batch_matches_single_lookups(engine, cell_size):
+    ff = FlowField(120, 90, cell_size=cell_size, engine=engine)
+    ff.compute((110, 20), OBSTACLES, margin=2.0)
+    rng = np.random.default_rng(5)
+    points = rng.uniform(-5, 125, size=(500, 2))
+    vectors = ff.get_vectors(points)
+    distances = ff.get_distances(points.tolist())
+    assert vectors.shape == (500, 2)
+    for point, vector, distance in zip(points.tolist(), vectors, distances):
+        assert tuple(vector) == pytest.approx(ff.get_vector(point), abs=1e-12)
+        assert distance == ff.get_distance(point)
+
+
+def test_batch_before_compute():
+    ff = FlowField(20, 20)
+    assert ff.get_vectors([(1, 1), (5, 5)]).tolist() == [[0.0, 0.0], [0.0, 0.0]]
+    assert ff.get_distances([(1, 1)]).tolist() == [ff.INF]
+    assert ff.get_vectors([]).shape == (0, 2)
@@ -0,0 +1,160 @@
+import os
+import sys
+import math
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from flow_field import FlowField
+from collision_shape import CollisionShape
+
+
+OBSTACLES = [CollisionShape((60, 40), 10), CollisionShape((100, 70), 8)]
+GOAL = (110, 20)
+NEAR = (80, 10, 100, 30)
+FAR = (5, 70, 20, 85)
+
+
+def full_field():
+    ff = FlowField(120, 90, engine="dijkstra")
+    ff.compute(GOAL, OBSTACLES, margin=2.0)
+    return ff
+
+
+def assert_same_costs(bounded, full, bounds):
+    x0, y0, x1, y1 = bounded._cell_rect(bounds)
+    for y in range(y0, y1 + 1):
+        for x in range(x0, x1 + 1):
+            expected = full.cost_at(x, y)
+            if math.isinf(expected):
+                assert math.isinf(bounded.cost_at(x, y))
+            else:
+                assert bounded.cost_at(x, y) == pytest.approx(expected, abs=1e-3)
+                pos = bounded._cell_center(x, y)
+                assert bounded.get_vector(pos) == full.get_vector(pos)
+
+
+@pytest.mark.parametrize("engine", FlowField.ENGINES)
+def test_bounded_search_stops_early(engine):
+    full = full_field()
+    ff = FlowField(120, 90, engine=engine)
+    ff.compute(GOAL, OBSTACLES, margin=2.0, bounds=NEAR)
+    assert not ff.complete
+    assert ff.expansions < full.expansions / 2
+    assert ff.covers(NEAR)
+    assert not ff.covers(FAR)
+    assert_same_costs(ff, full, NEAR)
+
+
+def test_extend_settles_new_bounds():
+    full = full_field()
+    ff = FlowField(120, 90)
+    ff.compute(GOAL, OBSTACLES, margin=2.0, bounds=NEAR)
+    before = ff.copy()
+    ff.extend(FAR)
+    assert ff.covers(FAR)
+    assert not before.covers(FAR)
+    assert_same_costs(ff, full, FAR)
+    ff.extend((0, 0, 119, 89))
+    assert ff.complete
+    assert ff.max_distance == pytest.approx(full.max_distance, abs=1e-3)
+
+
+def test_bounded_field_cannot_be_repaired():
+    ff = FlowField(120, 90)
+    ff.compute(GOAL, OBSTACLES, margin=2.0, bounds=NEAR)
+    with pytest.raises(ValueError):
+        ff.repaired(OBSTACLES[:1], OBSTACLES[1:])
+
+
+def test_swarm_extends_bounded_field():
+    pytest.importorskip('pygame')
+    from flag import NormalFlag
+    from flow_field_cache import FlowFieldCache
+    from flow_field_scheduler import FlowFieldScheduler
+    from swarm import Swarm
+
+    swarm = Swarm(
+        (255, 0, 0), 1, (255, 100, 100), width=120, height=90,
+        flow_field_cache=FlowFieldCache(),
+        flow_field_scheduler=FlowFieldScheduler(),
+        line_of_sight=False,
+        flow_field_bounds_margin=4,
+    )
+    swarm.ants = [[90, 20], [92, 22]]
+    swarm.queue.add_flag_at(GOAL, NormalFlag)
+    swarm._update_flow_field()
+    swarm.flow_field_scheduler.join()
+    first = swarm._flow_field
+    assert not first.complete
+
+    swarm.ants = [[10, 80], [12, 82]]
+    swarm._update_flow_field()
+    swarm.flow_field_scheduler.join()
+    assert swarm._flow_field is not first
+    assert swarm._flow_field.covers(swarm._flow_field_bounds())
+    assert not first.covers(swarm._flow_field_bounds())
+
+
+def test_bounded_and_full_fields_are_cached_apart():
+    pytest.importorskip('pygame')
+    from flag import NormalFlag
+    from flow_field_cache import FlowFieldCache
+    from flow_field_scheduler import FlowFieldScheduler
+    from swarm import Swarm
+
+    cache = FlowFieldCache()
+    scheduler = FlowFieldScheduler()
+    swarms = []
+    for margin, ants in ((4, [[90, 20], [92, 22]]), (None, [[10, 80], [12, 82]])):
+        swarm = Swarm(
+            (255, 0, 0), 1, (255, 100, 100), width=120, height=90,
+            flow_field_cache=cache,
+            flow_field_scheduler=scheduler,
+            line_of_sight=False,
+            flow_field_bounds_margin=margin,
+        )
+        swarm.ants = ants
+        swarm.queue.add_flag_at(GOAL, NormalFlag)
+        swarm._update_flow_field()
+        scheduler.join()
+        swarms.append(swarm)
+
+    bounded, unbounded = swarms
+    assert not bounded._flow_field.complete
+    assert cache.hits == 0 and len(cache) == 2
+    assert unbounded._flow_field.complete
+    assert unbounded._flow_field.get_distance((10, 80)) < unbounded._flow_field.INF
+
+
+def test_failed_extension_is_not_retried():
+    pytest.importorskip('pygame')
+    from flag import NormalFlag
+    from flow_field_cache import FlowFieldCache
+    from flow_field_scheduler import FlowFieldScheduler
+    from swarm import Swarm
+
+    swarm = Swarm(
+        (255, 0, 0), 1, (255, 100, 100), width=120, height=90,
+        flow_field_cache=FlowFieldCache(),
+        flow_field_scheduler=FlowFieldScheduler(),
+        line_of_sight=False,
+        flow_field_bounds_margin=4,
+    )
+    swarm.ants = [[90, 20], [92, 22]]
+    swarm.queue.add_flag_at(GOAL, NormalFlag)
+    swarm._update_flow_field()
+    swarm.flow_field_scheduler.join()
+    field = swarm._flow_field
+
+    def broken(bounds):
+        raise RuntimeError("no extension")
+
+    field.copy = lambda: field
+    field.extend = broken
+    swarm.ants = [[10, 80], [12, 82]]
+    for _ in range(3):
+        swarm._update_flow_field()
+        swarm.flow_field_scheduler.join()
+    assert swarm.flow_field_scheduler.failed == 1
+    assert swarm._flow_field is field
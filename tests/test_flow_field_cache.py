@@ -0,0 +1,74 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+pytest.importorskip('pygame')
+
+from flow_field import FlowField
+from flow_field_cache import FlowFieldCache
+from destructibles import Destructibles, Tree
+from flag import NormalFlag
+from stage import Stage
+from swarm import Swarm
+
+
+def make_field(goal):
+    ff = FlowField(40, 30, cell_size=2)
+    ff.compute(goal, [])
+    return ff
+
+
+def test_lru_eviction_respects_byte_cap():
+    field = make_field((5, 5))
+    cache = FlowFieldCache(max_bytes=field.nbytes * 2)
+    cache.put("a", field)
+    cache.put("b", make_field((10, 10)))
+    assert cache.get("a") is field
+    cache.put("c", make_field((20, 20)))
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+    assert cache.nbytes <= cache.max_bytes
+
+
+def test_key_uses_goal_cell():
+    key = FlowFieldCache.key
+    assert key(40, 30, 4, (5, 5), 1, 5.0, "bfs") == key(40, 30, 4, (7.5, 6), 1, 5.0, "bfs")
+    assert key(40, 30, 4, (5, 5), 1, 5.0, "bfs") != key(40, 30, 4, (9, 5), 1, 5.0, "bfs")
+    assert key(40, 30, 4, (5, 5), 1, 5.0, "bfs") != key(40, 30, 4, (5, 5), 2, 5.0, "bfs")
+
+
+def test_destructibles_version_changes_with_trees():
+    destruct = Destructibles(100, 100, num_trees=0)
+    before = destruct.version
+    tree = Tree((50, 50), 5, owner=destruct)
+    destruct.add_stage(tree)
+    added = destruct.version
+    destruct.remove_stage(tree)
+    assert len({before, added, destruct.version}) == 3
+    assert Destructibles(100, 100, num_trees=0).version != destruct.version
+
+
+def test_swarms_share_cached_field():
+    cache = FlowFieldCache()
+    root = Stage()
+    destruct = Destructibles(100, 100, num_trees=0)
+    destruct.add_stage(Tree((50, 50), 5, owner=destruct))
+    root.destructibles = destruct
+    root.add_stage(destruct)
+    swarms = []
+    for group in (1, 2):
+        swarm = Swarm((255, 0, 0), group, (255, 100, 100), width=100, height=100, flow_field_cache=cache)
+        swarm.ants = [[10, 10]]
+        root.add_stage(swarm)
+        swarm.queue.add_flag_at((90, 90), NormalFlag)
+        swarms.append(swarm)
+
+    swarms[0]._update_flow_field()
+    swarms[0].flow_field_scheduler.join()
+    computed = swarms[0].flow_field_scheduler.computed
+    swarms[1]._update_flow_field()
+    assert swarms[1]._flow_field is swarms[0]._flow_field
+    assert swarms[1].flow_field_scheduler.computed == computed
+    assert cache.hits == 1
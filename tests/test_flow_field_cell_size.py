@@ -0,0 +1,54 @@
+import os
+import sys
+import math
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from flow_field import FlowField
+from collision_shape import CollisionShape
+
+
+def test_coarse_grid_reduces_nodes():
+    fine = FlowField(64, 48)
+    coarse = FlowField(64, 48, cell_size=8)
+    assert (coarse.grid_w, coarse.grid_h) == (8, 6)
+    assert len(coarse.costs) * 64 == len(fine.costs)
+
+
+@pytest.mark.parametrize("engine", FlowField.ENGINES)
+def test_interpolated_vectors_are_smooth(engine):
+    ff = FlowField(80, 80, cell_size=8, engine=engine)
+    ff.compute((76, 40), [CollisionShape((40, 20), 6)], margin=2.0)
+    previous = None
+    for step in range(0, 64):
+        pos = (10 + step * 0.5, 61.0)
+        vx, vy = ff.get_vector(pos)
+        assert math.hypot(vx, vy) == pytest.approx(1.0)
+        if previous is not None:
+            # neighbouring samples never jump by a whole 45 degree step
+            assert math.hypot(vx - previous[0], vy - previous[1]) < 0.3
+        previous = (vx, vy)
+
+
+def test_goal_cell_stays_still_on_coarse_grid():
+    ff = FlowField(80, 80, cell_size=8)
+    ff.compute((44, 44), [])
+    assert ff.get_vector((42, 45)) == (0.0, 0.0)
+    vx, vy = ff.get_vector((10, 44))
+    assert vx > 0.9
+
+
+def test_swarm_uses_flow_cell_size():
+    pytest.importorskip('pygame')
+    from swarm import Swarm
+    from flag import NormalFlag
+
+    swarm = Swarm((255, 0, 0), 1, (255, 100, 100), width=64, height=48, flow_cell_size=8,
+                  line_of_sight=False)
+    swarm.ants = [[5, 5]]
+    swarm.queue.add_flag_at((60, 40), NormalFlag)
+    swarm._update_flow_field()
+    swarm.flow_field_scheduler.join()
+    assert swarm._flow_field.cell_size == 8
+    assert swarm._flow_field.grid_w == 8
@@ -0,0 +1,111 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+pytest.importorskip('pygame')
+
+from collision_shape import CollisionShape
+from flag import NormalFlag
+from flow_field import FlowField
+from flow_field_cache import FlowFieldCache
+from flow_field_scheduler import FlowFieldScheduler
+from swarm import Swarm
+
+
+def create_swarm(**kwargs):
+    swarm = Swarm(
+        (255, 0, 0), 1, (255, 100, 100), width=160, height=120,
+        flow_field_cache=FlowFieldCache(),
+        flow_field_scheduler=FlowFieldScheduler(),
+        line_of_sight=False,
+        flow_cell_size=2,
+        **kwargs
+    )
+    swarm.ants = [[10, 10], [12, 14]]
+    return swarm
+
+
+def test_coarse_field_published_immediately():
+    swarm = create_swarm(flow_field_coarse_sizes=(16, 8))
+    published = []
+    publish = swarm._publish_provisional
+
+    def record(key, ff):
+        published.append(ff.cell_size)
+        publish(key, ff)
+
+    swarm._publish_provisional = record
+    swarm.queue.add_flag_at((150, 110), NormalFlag)
+    swarm._update_flow_field()
+    assert swarm._flow_field is not None
+    assert published[0] == 16
+    swarm.flow_field_scheduler.join()
+    assert published == [16, 8]
+    assert swarm._flow_field.cell_size == 2
+    assert swarm._flow_field_live_key == swarm._flow_field_key(swarm.first_flag())
+
+
+def test_coarse_fields_skip_pool_and_store():
+    from destructibles import Destructibles
+    from stage import Stage
+
+    sizes = []
+
+    class Pool:
+        def submit(self, width, height, cell_size, engine, goal, obstacles, margin):
+            sizes.append(("pool", cell_size))
+            ff = FlowField(width, height, cell_size=cell_size, engine=engine)
+            ff.compute(goal, obstacles, margin=margin)
+            return Done(ff)
+
+    class Done:
+        def __init__(self, ff):
+            self.ff = ff
+
+        def result(self):
+            return self.ff
+
+    class Store:
+        def key(self, layout, width, height, cell_size, *args):
+            sizes.append(("store", cell_size))
+            return cell_size
+
+        def load(self, key, *args):
+            return None
+
+        def save(self, key, ff):
+            pass
+
+    root = Stage()
+    root.destructibles = Destructibles(160, 120, num_trees=0)
+    swarm = create_swarm(
+        flow_field_coarse_sizes=(16, 8), flow_field_pool=Pool(), flow_field_store=Store()
+    )
+    root.add_stage(swarm)
+    swarm.queue.add_flag_at((150, 110), NormalFlag)
+    swarm._update_flow_field()
+    assert swarm._flow_field.cell_size == 16
+    swarm.flow_field_scheduler.join()
+    assert swarm._flow_field.cell_size == 2
+    assert sizes == [("store", 2), ("pool", 2)]
+
+
+def test_without_coarse_sizes_waits_for_field():
+    swarm = create_swarm()
+    swarm.queue.add_flag_at((150, 110), NormalFlag)
+    swarm._update_flow_field()
+    swarm.flow_field_scheduler.join()
+    assert swarm._flow_field.cell_size == 2
+
+
+def test_unreachable_coarse_field_is_not_used():
+    swarm = create_swarm(flow_field_coarse_sizes=(16,))
+    swarm.queue.add_flag_at((150, 110), NormalFlag)
+    key = swarm._flow_field_key(swarm.first_flag())
+    swarm._flow_field_wanted_key = key
+    walled = FlowField(160, 120, cell_size=16)
+    walled.compute((150, 110), [CollisionShape((10, 10), 12)])
+    swarm._publish_provisional(key, walled)
+    assert swarm._flow_field is None
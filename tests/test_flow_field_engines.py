@@ -0,0 +1,86 @@
+import os
+import sys
+import math
+from array import array
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from flow_field import FlowField
+from collision_shape import CollisionShape
+
+
+OBSTACLES = [
+    CollisionShape((20, 20), 6),
+    CollisionShape((35, 10), 4),
+    CollisionShape((10, 40), 5),
+]
+
+
+def compute(engine):
+    ff = FlowField(60, 50, cell_size=1, engine=engine)
+    ff.compute((55, 45), OBSTACLES, margin=2.0)
+    return ff
+
+
+def test_dijkstra_matches_bfs_costs():
+    bfs = compute("bfs")
+    dijkstra = compute("dijkstra")
+    for y in range(bfs.grid_h):
+        for x in range(bfs.grid_w):
+            a = bfs.cost_at(x, y)
+            b = dijkstra.cost_at(x, y)
+            if math.isinf(a):
+                assert math.isinf(b)
+            else:
+                assert b == pytest.approx(a)
+    assert dijkstra.max_distance == pytest.approx(bfs.max_distance)
+    assert dijkstra.get_vector((5, 5)) == bfs.get_vector((5, 5))
+
+
+def test_dijkstra_expands_each_cell_once():
+    bfs = compute("bfs")
+    dijkstra = compute("dijkstra")
+    reachable = sum(1 for v in dijkstra.costs if math.isfinite(v))
+    assert dijkstra.expansions == reachable
+    assert dijkstra.relaxations <= bfs.relaxations
+    assert bfs.expansions >= reachable
+
+
+def test_unknown_engine_rejected():
+    with pytest.raises(ValueError):
+        FlowField(10, 10, engine="astar")
+
+
+def test_numpy_engine_matches_dijkstra():
+    dijkstra = compute("dijkstra")
+    vectorized = compute("numpy")
+    for y in range(dijkstra.grid_h):
+        for x in range(dijkstra.grid_w):
+            a = dijkstra.cost_at(x, y)
+            b = vectorized.cost_at(x, y)
+            if math.isinf(a):
+                assert math.isinf(b)
+            else:
+                assert b == pytest.approx(a, abs=1e-4)
+            pos = (x + 0.5, y + 0.5)
+            assert vectorized.get_vector(pos) == pytest.approx(dijkstra.get_vector(pos))
+    assert vectorized.max_distance == pytest.approx(dijkstra.max_distance)
+
+
+def test_numpy_engine_blocked_goal():
+    ff = FlowField(30, 30, engine="numpy")
+    ff.compute((15, 15), [CollisionShape((15, 15), 4)])
+    assert ff.get_distance((2, 2)) == ff.INF
+    assert ff.get_vector((2, 2)) == (0.0, 0.0)
+    assert ff.max_distance == 0.0
+
+
+def test_storage_is_packed():
+    for engine in FlowField.ENGINES:
+        ff = compute(engine)
+        cells = ff.grid_w * ff.grid_h
+        assert isinstance(ff.costs, array)
+        assert ff.costs.typecode == "f"
+        assert isinstance(ff._directions, bytearray)
+        assert ff.nbytes == cells * 6
@@ -13,3 +13,16 @@ def test_obstacle_margin_blocks_cells():
     ff.compute((40, 40), [obstacle], margin=5.0)
     assert ff.get_distance((25, 20)) == ff.INF
     assert ff.get_distance((31, 20)) != ff.INF
+
+
+def test_rasterized_mask_matches_cell_tests():
+    ff = FlowField(60, 45, cell_size=4)
+    obstacles = [CollisionShape((20, 20), 5), CollisionShape((0, 44), 7), CollisionShape((58, 3), 2.5)]
+    blocked, _ = ff._rasterize_obstacles(obstacles, 3.0)
+    for y in range(ff.grid_h):
+        for x in range(ff.grid_w):
+            cell = CollisionShape(ff._cell_center(x, y), ff.cell_size / 2)
+            expected = any(
+                cell.collidesWith(CollisionShape(o.center, o.radius + 3.0)) for o in obstacles
+            )
+            assert blocked[y * ff.grid_w + x] == expected
@@ -0,0 +1,60 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from flow_field import FlowField
+from flow_field_pool import FlowFieldPool
+from collision_shape import CollisionShape
+
+
+OBSTACLES = [CollisionShape((20, 20), 6), CollisionShape((35, 10), 4)]
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = FlowFieldPool(max_workers=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_buffers_round_trip():
+    ff = FlowField(30, 20, engine="numpy")
+    ff.compute((25, 15), OBSTACLES)
+    copy = FlowField(30, 20, engine="numpy")
+    buffer = bytearray(ff.nbytes)
+    ff.write_buffers(buffer)
+    copy.read_buffers(buffer)
+    assert copy.costs == ff.costs
+    assert copy._directions == ff._directions
+
+
+@pytest.mark.parametrize("engine", ["bfs", "numpy"])
+def test_pool_matches_local_compute(pool, engine):
+    local = FlowField(60, 50, cell_size=2, engine=engine)
+    local.compute((55, 45), OBSTACLES, margin=2.0)
+    remote = pool.submit(60, 50, 2, engine, (55, 45), OBSTACLES, 2.0).result(timeout=60)
+    assert remote.costs == local.costs
+    assert remote.max_distance == local.max_distance
+    assert remote.expansions == local.expansions
+    for pos in [(1, 1), (30, 5), (10, 45), (58, 2)]:
+        assert remote.get_vector(pos) == local.get_vector(pos)
+
+
+def test_swarm_publishes_pool_result(pool):
+    pytest.importorskip('pygame')
+    from swarm import Swarm
+    from flag import NormalFlag
+    from flow_field_cache import FlowFieldCache
+
+    swarm = Swarm(
+        (255, 0, 0), 1, (255, 100, 100), width=64, height=48,
+        flow_field_cache=FlowFieldCache(), flow_field_pool=pool, line_of_sight=False,
+    )
+    swarm.ants = [[5, 5]]
+    swarm.queue.add_flag_at((60, 40), NormalFlag)
+    swarm._update_flow_field()
+    assert swarm.flow_field_scheduler.join(timeout=60)
+    assert swarm._flow_field is not None
+    assert swarm._flow_field.get_distance((5, 5)) > 0
@@ -0,0 +1,58 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+pytest.importorskip('pygame')
+
+from flag import NormalFlag
+from flow_field_cache import FlowFieldCache
+from flow_field_scheduler import FlowFieldScheduler
+from swarm import Swarm
+
+
+def create_swarm(prefetch=2):
+    swarm = Swarm(
+        (255, 0, 0), 1, (255, 100, 100), width=80, height=60,
+        flow_field_cache=FlowFieldCache(),
+        flow_field_scheduler=FlowFieldScheduler(),
+        flow_field_prefetch=prefetch,
+        line_of_sight=False,
+    )
+    swarm.ants = [[5, 5]]
+    return swarm
+
+
+def test_appending_behind_head_keeps_field():
+    swarm = create_swarm()
+    swarm.queue.add_flag_at((70, 50), NormalFlag)
+    swarm._update_flow_field()
+    swarm.flow_field_scheduler.join()
+    field = swarm._flow_field
+    assert field is not None
+
+    swarm.queue.add_flag_at((10, 50), NormalFlag)
+    assert swarm._flow_field is field
+    swarm.queue.pop(-1)
+    assert swarm._flow_field is field
+
+
+def test_queued_flags_are_prefetched():
+    swarm = create_swarm()
+    flags = [swarm.queue.add_flag_at(pos, NormalFlag) for pos in [(70, 50), (10, 50), (40, 5), (60, 20)]]
+    swarm._update_flow_field()
+    swarm.flow_field_scheduler.join()
+    for flag in flags[:3]:
+        assert swarm._flow_field_key(flag) in swarm.flow_field_cache
+    assert swarm._flow_field_key(flags[3]) not in swarm.flow_field_cache
+
+    computed = swarm.flow_field_scheduler.computed
+    swarm.queue.pop(0)
+    swarm._update_flow_field()
+    assert swarm._flow_field is swarm.flow_field_cache.get(swarm._flow_field_key(flags[1]))
+    swarm.flow_field_scheduler.join()
+    # the new head was ready; only the flag now two behind it was fetched
+    assert swarm.flow_field_scheduler.computed == computed + 1
+    assert swarm._flow_field_key(flags[3]) in swarm.flow_field_cache
+
@@ -0,0 +1,132 @@
+import os
+import sys
+import math
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from flow_field import FlowField
+from collision_shape import CollisionShape
+
+
+OBSTACLES = [
+    CollisionShape((20, 20), 6),
+    CollisionShape((35, 10), 4),
+    CollisionShape((10, 40), 5),
+    CollisionShape((28, 24), 5),
+]
+
+
+@pytest.mark.parametrize("engine", FlowField.ENGINES)
+def test_repair_matches_full_compute(engine):
+    old = FlowField(60, 50, engine=engine)
+    old.compute((55, 45), OBSTACLES, margin=2.0)
+    before = list(old.costs)
+    remaining = [OBSTACLES[0], OBSTACLES[2], OBSTACLES[3]]
+    repaired = old.repaired([OBSTACLES[1]], remaining)
+
+    fresh = FlowField(60, 50, engine=engine)
+    fresh.compute((55, 45), remaining, margin=2.0)
+    assert repaired.blocked == fresh.blocked
+    for a, b in zip(repaired.costs, fresh.costs):
+        if math.isinf(b):
+            assert math.isinf(a)
+        else:
+            assert a == pytest.approx(b, abs=1e-2)
+    for pos in [(35.5, 10.5), (5.5, 5.5), (30.5, 1.5)]:
+        assert repaired.get_vector(pos) == pytest.approx(fresh.get_vector(pos), abs=1e-6)
+    # the old field is left as it was
+    assert list(old.costs) == before
+    assert repaired.expansions < fresh.grid_w * fresh.grid_h / 2
+
+
+def test_repair_reopens_blocked_goal():
+    old = FlowField(30, 30)
+    obstacle = CollisionShape((15, 15), 4)
+    old.compute((15, 15), [obstacle])
+    assert old.max_distance == 0.0
+    repaired = old.repaired([obstacle], [])
+    assert repaired.get_distance((15, 15)) == 0.0
+    assert repaired.get_distance((2, 15)) == pytest.approx(13)
+    assert repaired.get_vector((2.5, 15.5)) == (1.0, 0.0)
+
+
+def test_swarm_repairs_after_tree_removal():
+    pytest.importorskip('pygame')
+    from destructibles import Destructibles, Tree
+    from flag import NormalFlag
+    from flow_field_cache import FlowFieldCache
+    from stage import Stage
+    from swarm import Swarm
+
+    root = Stage()
+    destruct = Destructibles(100, 100, num_trees=0)
+    trees = [Tree((50, 50), 8, owner=destruct), Tree((20, 70), 6, owner=destruct)]
+    for tree in trees:
+        destruct.add_stage(tree)
+    root.destructibles = destruct
+    root.add_stage(destruct)
+    swarm = Swarm((255, 0, 0), 1, (255, 100, 100), width=100, height=100,
+                  flow_field_cache=FlowFieldCache(), line_of_sight=False)
+    swarm.ants = [[10, 10]]
+    root.add_stage(swarm)
+    destruct.register_invalidator(swarm.invalidate_flow_field)
+    flag = swarm.queue.add_flag_at((90, 90), NormalFlag)
+    swarm._update_flow_field()
+    swarm.flow_field_scheduler.join()
+    old = swarm._flow_field
+
+    destruct.remove_stage(trees[0])
+    assert swarm._flow_field is old
+    swarm._update_flow_field()
+    swarm.flow_field_scheduler.join()
+    assert swarm._flow_field is not old
+    assert swarm._flow_field.get_distance((50, 50)) < old.INF
+    assert swarm._flow_field.expansions < 100 * 100 / 2
+
+    # moving the flag within its cell keeps the field
+    current = swarm._flow_field
+    flag.pos = (90.4, 90.2)
+    swarm._update_flow_field()
+    assert swarm._flow_field is current
+    assert swarm.flow_field_scheduler.pending(swarm) is None
+
+    # moving it further recomputes without dropping the current field
+    flag.pos = (10, 90)
+    swarm._update_flow_field()
+    assert swarm._flow_field is not None
+    swarm.flow_field_scheduler.join()
+    assert swarm._flow_field.cell_of(swarm._flow_field.goal) == (10, 90)
+
+
+def test_repair_clears_tree_removed_while_shaking():
+    pytest.importorskip('pygame')
+    from destructibles import Destructibles, Tree
+    from flag import NormalFlag
+    from flow_field_cache import FlowFieldCache
+    from stage import Stage
+    from swarm import Swarm, FLOW_FIELD_MARGIN
+
+    root = Stage()
+    destruct = Destructibles(100, 100, num_trees=0)
+    trees = [Tree((50, 50), 8, owner=destruct), Tree((20, 70), 6, owner=destruct)]
+    for tree in trees:
+        destruct.add_stage(tree)
+    root.destructibles = destruct
+    root.add_stage(destruct)
+    swarm = Swarm((255, 0, 0), 1, (255, 100, 100), width=100, height=100,
+                  flow_field_cache=FlowFieldCache(), line_of_sight=False)
+    swarm.ants = [[10, 10]]
+    root.add_stage(swarm)
+    destruct.register_invalidator(swarm.invalidate_flow_field)
+    swarm.queue.add_flag_at((90, 90), NormalFlag)
+    swarm._update_flow_field()
+    swarm.flow_field_scheduler.join()
+
+    trees[0].offset = (3.0, -2.0)
+    destruct.remove_stage(trees[0])
+    swarm._update_flow_field()
+    swarm.flow_field_scheduler.join()
+    full = FlowField(100, 100)
+    full.compute((90, 90), [CollisionShape((20, 70), 6)], margin=FLOW_FIELD_MARGIN)
+    assert swarm._flow_field.blocked == full.blocked
@@ -0,0 +1,174 @@
+import os
+import sys
+import threading
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from flow_field_scheduler import FlowFieldScheduler
+
+
+class Gate:
+    """Compute callable that blocks until released."""
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        return self.result
+
+
+def test_identical_requests_share_one_job():
+    scheduler = FlowFieldScheduler()
+    gate = Gate("field")
+    results = []
+    scheduler.submit("a", "key", gate, results.append)
+    scheduler.submit("b", "key", Gate("other"), results.append)
+    gate.release.set()
+    assert scheduler.join(5)
+    assert gate.calls == 1
+    assert results == ["field", "field"]
+    assert scheduler.computed == 1
+
+
+def test_superseded_requests_are_dropped():
+    scheduler = FlowFieldScheduler(max_workers=1)
+    busy = Gate("busy")
+    scheduler.submit("x", "busy", busy, lambda field: None)
+    assert busy.started.wait(5)
+
+    stale = Gate("stale")
+    results = []
+    scheduler.submit("a", "old", stale, results.append)
+    fresh = Gate("fresh")
+    fresh.release.set()
+    scheduler.submit("a", "new", fresh, results.append)
+    busy.release.set()
+    assert scheduler.join(5)
+    assert stale.calls == 0
+    assert results == ["fresh"]
+
+
+def test_running_result_not_delivered_after_supersede():
+    scheduler = FlowFieldScheduler()
+    slow = Gate("slow")
+    results = []
+    scheduler.submit("a", "slow", slow, results.append)
+    assert slow.started.wait(5)
+    fast = Gate("fast")
+    fast.release.set()
+    scheduler.submit("a", "fast", fast, results.append)
+    assert fast.started.wait(5)
+    slow.release.set()
+    assert scheduler.join(5)
+    assert results == ["fast"]
+
+
+def test_concurrency_is_capped():
+    scheduler = FlowFieldScheduler(max_workers=2)
+    gates = [Gate(i) for i in range(4)]
+    for i, gate in enumerate(gates):
+        scheduler.submit(i, i, gate, lambda field: None)
+    assert gates[0].started.wait(5) and gates[1].started.wait(5)
+    assert len(scheduler) == 4
+    assert gates[2].calls == 0 and gates[3].calls == 0
+    for gate in gates:
+        gate.release.set()
+    assert scheduler.join(5)
+    assert all(gate.calls == 1 for gate in gates)
+
+
+def test_cancel_withdraws_request():
+    scheduler = FlowFieldScheduler(max_workers=1)
+    busy = Gate("busy")
+    scheduler.submit("x", "busy", busy, lambda field: None)
+    assert busy.started.wait(5)
+    queued = Gate("queued")
+    scheduler.submit("a", "queued", queued, lambda field: None)
+    assert scheduler.pending("a") == "queued"
+    scheduler.cancel("a")
+    assert scheduler.pending("a") is None
+    busy.release.set()
+    assert scheduler.join(5)
+    assert queued.calls == 0
+
+
+def test_new_head_at_same_cell_is_published():
+    pytest.importorskip('pygame')
+    from flag import NormalFlag
+    from flow_field_cache import FlowFieldCache
+    from swarm import Swarm
+
+    swarm = Swarm(
+        (255, 0, 0), 1, (255, 100, 100), width=80, height=60,
+        flow_field_cache=FlowFieldCache(),
+        flow_field_scheduler=FlowFieldScheduler(),
+        line_of_sight=False,
+    )
+    swarm.ants = [[5, 5]]
+    swarm.queue.add_flag_at((70, 50), NormalFlag)
+    swarm._update_flow_field()
+    swarm.flow_field_scheduler.join()
+    swarm.queue.add_flag_at((70.5, 50.5), NormalFlag)
+    swarm.queue.pop(0)
+    assert swarm._flow_field is None
+    swarm._update_flow_field()
+    assert swarm._flow_field is not None
+
+
+def test_failed_job_reaches_error_callbacks():
+    scheduler = FlowFieldScheduler()
+    results = []
+    errors = []
+
+    def broken():
+        raise RuntimeError("no field")
+
+    scheduler.submit("a", "key", broken, results.append, errback=errors.append)
+    assert scheduler.join(5)
+    assert results == []
+    assert [str(error) for error in errors] == ["no field"]
+    assert scheduler.failed == 1 and scheduler.computed == 0
+    assert scheduler.pending("a") is None
+
+    scheduler.submit("a", "key", lambda: "field", results.append)
+    assert scheduler.join(5)
+    assert results == ["field"]
+
+
+def test_swarm_retries_failed_field():
+    pytest.importorskip('pygame')
+    from flag import NormalFlag
+    from flow_field_cache import FlowFieldCache
+    from swarm import Swarm
+
+    swarm = Swarm(
+        (255, 0, 0), 1, (255, 100, 100), width=100, height=100,
+        flow_field_cache=FlowFieldCache(),
+        flow_field_scheduler=FlowFieldScheduler(),
+        line_of_sight=False,
+        flow_field_prefetch=0,
+    )
+    swarm.ants = [[10, 10]]
+    swarm.queue.add_flag_at((90, 90), NormalFlag)
+    compute = swarm._compute_flow_field
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("no field")
+
+    swarm._compute_flow_field = broken
+    swarm._update_flow_field()
+    swarm.flow_field_scheduler.join(5)
+    assert swarm._flow_field is None
+    assert swarm._flow_field_wanted_key is None
+
+    swarm._compute_flow_field = compute
+    swarm._update_flow_field()
+    swarm.flow_field_scheduler.join(5)
+    assert swarm._flow_field is not None
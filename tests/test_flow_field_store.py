@@ -0,0 +1,126 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from flow_field import FlowField
+from flow_field_store import FlowFieldStore
+from collision_shape import CollisionShape
+
+
+OBSTACLES = [CollisionShape((20, 20), 6), CollisionShape((35, 10), 4)]
+
+
+def compute(goal=(55, 45), engine="bfs"):
+    ff = FlowField(60, 50, cell_size=2, engine=engine)
+    ff.compute(goal, OBSTACLES, margin=2.0)
+    return ff
+
+
+def store_key(goal, layout="layout"):
+    return FlowFieldStore.key(layout, 60, 50, 2, goal, 2.0, "bfs")
+
+
+def test_round_trip(tmp_path):
+    store = FlowFieldStore(str(tmp_path))
+    ff = compute()
+    ff.get_vector((3, 3))
+    key = store_key(ff.goal)
+    assert store.load(key, 60, 50, 2, "bfs") is None
+    store.save(key, ff)
+    loaded = store.load(key, 60, 50, 2, "bfs")
+    assert loaded.costs == ff.costs
+    assert loaded._directions == ff._directions
+    assert loaded.blocked == ff.blocked
+    assert loaded.goal == ff.goal
+    assert loaded.max_distance == ff.max_distance
+    assert loaded.get_vector((30, 30)) == ff.get_vector((30, 30))
+    assert (store.hits, store.misses) == (1, 1)
+
+
+def test_mismatched_or_damaged_files_are_ignored(tmp_path):
+    store = FlowFieldStore(str(tmp_path))
+    key = store_key((55, 45))
+    store.save(key, compute())
+    assert store.load(key, 80, 50, 2, "bfs") is None
+    with open(os.path.join(str(tmp_path), key + FlowFieldStore.SUFFIX), "r+b") as handle:
+        handle.truncate(100)
+    assert store.load(key, 60, 50, 2, "bfs") is None
+
+
+def test_bounded_fields_are_not_saved(tmp_path):
+    store = FlowFieldStore(str(tmp_path))
+    ff = FlowField(60, 50)
+    ff.compute((55, 45), OBSTACLES, bounds=(50, 40, 58, 48))
+    store.save("bounded", ff)
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_least_recently_used_files_are_removed(tmp_path):
+    ff = compute()
+    size = FlowFieldStore.HEADER.size + ff.nbytes
+    store = FlowFieldStore(str(tmp_path), max_bytes=size * 2)
+    keys = [store_key((x, 45)) for x in (5, 25)]
+    for age, key in zip((200, 100), keys):
+        store.save(key, ff)
+        path = os.path.join(str(tmp_path), key + FlowFieldStore.SUFFIX)
+        os.utime(path, (1000 - age, 1000 - age))
+    # loading refreshes the oldest file, so the other one is evicted
+    assert store.load(keys[0], 60, 50, 2, "bfs") is not None
+    store.save(store_key((45, 45)), ff)
+    assert store.load(keys[1], 60, 50, 2, "bfs") is None
+    assert store.load(keys[0], 60, 50, 2, "bfs") is not None
+    assert store.load(store_key((45, 45)), 60, 50, 2, "bfs") is not None
+
+
+def test_directory_is_scanned_only_over_the_cap(tmp_path, monkeypatch):
+    ff = compute()
+    size = FlowFieldStore.HEADER.size + ff.nbytes
+    FlowFieldStore(str(tmp_path)).save(store_key((5, 45)), ff)
+    store = FlowFieldStore(str(tmp_path), max_bytes=size * 2)
+    assert store.nbytes == size
+    scans = []
+    entries = store._entries
+    monkeypatch.setattr(store, "_entries", lambda: scans.append(1) or entries())
+    store.save(store_key((5, 45)), ff)
+    store.save(store_key((25, 45)), ff)
+    assert (store.nbytes, scans) == (size * 2, [])
+    store.save(store_key((45, 45)), ff)
+    assert (store.nbytes, scans) == (size * 2, [1])
+    assert len(os.listdir(str(tmp_path))) == 2
+
+
+def test_swarms_share_fields_through_store(tmp_path):
+    pytest.importorskip('pygame')
+    from destructibles import Destructibles, Tree
+    from flag import NormalFlag
+    from flow_field_cache import FlowFieldCache
+    from flow_field_scheduler import FlowFieldScheduler
+    from stage import Stage
+    from swarm import Swarm
+
+    store = FlowFieldStore(str(tmp_path))
+    swarms = []
+    for _ in range(2):
+        root = Stage()
+        destruct = Destructibles(100, 100, num_trees=0)
+        destruct.add_stage(Tree((50, 50), 8, owner=destruct))
+        root.destructibles = destruct
+        root.add_stage(destruct)
+        swarm = Swarm(
+            (255, 0, 0), 1, (255, 100, 100), width=100, height=100,
+            flow_field_cache=FlowFieldCache(),
+            flow_field_scheduler=FlowFieldScheduler(),
+            flow_field_store=store,
+        )
+        swarm.ants = [[10, 10]]
+        root.add_stage(swarm)
+        swarm.queue.add_flag_at((90, 90), NormalFlag)
+        swarm._update_flow_field()
+        swarm.flow_field_scheduler.join()
+        swarms.append(swarm)
+
+    assert swarms[0]._get_destructibles().version != swarms[1]._get_destructibles().version
+    assert store.hits == 1
+    assert swarms[1]._flow_field.costs == swarms[0]._flow_field.costs
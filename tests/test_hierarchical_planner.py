@@ -0,0 +1,151 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+np = pytest.importorskip('numpy')
+
+from flow_field import FlowField
+from hierarchical_planner import HierarchicalPlanner, HierarchicalField
+from collision_shape import CollisionShape
+
+
+OBSTACLES = [
+    CollisionShape((100, 100), 12),
+    CollisionShape((300, 200), 20),
+    CollisionShape((320, 60), 15),
+    CollisionShape((200, 400), 12),
+]
+
+
+def test_costs_match_flat_field_reachability():
+    planner = HierarchicalPlanner(640, 480, cell_size=4, cluster_size=8)
+    field = planner.field_to((600, 450), OBSTACLES, margin=5.0)
+    flat = FlowField(640, 480, cell_size=4, engine="dijkstra")
+    flat.compute((600, 450), OBSTACLES, margin=5.0)
+
+    points = np.random.default_rng(3).uniform((0, 0), (640, 480), size=(400, 2))
+    costs = field.get_distances(points)
+    expected = flat.get_distances(points)
+    assert np.array_equal(np.isfinite(costs), np.isfinite(expected))
+    reachable = np.isfinite(expected)
+    # Routes cross clusters near portals only, so they stay close to the
+    # shortest ones without matching them
+    assert (costs[reachable] <= 1.5 * expected[reachable] + 8).all()
+    assert (costs[reachable] >= 0.9 * expected[reachable]).all()
+    assert field.get_distance((600, 450)) == 0.0
+
+
+def test_following_the_field_reaches_the_goal():
+    rng = np.random.default_rng(0)
+    obstacles = [
+        CollisionShape(tuple(center), float(radius))
+        for center, radius in zip(
+            rng.uniform((0, 0), (640, 480), size=(40, 2)), rng.uniform(8, 20, size=40)
+        )
+    ]
+    goal = (380, 320)
+    planner = HierarchicalPlanner(640, 480, cell_size=4, cluster_size=16)
+    field = planner.field_to(goal, obstacles, margin=5.0)
+    flat = FlowField(640, 480, cell_size=4, engine="dijkstra")
+    flat.compute(goal, obstacles, margin=5.0)
+
+    arrived = 0
+    for start in rng.uniform((0, 0), (640, 480), size=(120, 2)):
+        if flat.get_distance(start) == flat.INF:
+            continue
+        x, y = field.cell_of(start)
+        for _ in range(planner.grid_w * planner.grid_h):
+            code = field._local(planner.cluster_of_cell(y * planner.grid_w + x))[2][
+                y % planner.cluster_size, x % planner.cluster_size
+            ]
+            if code == field.NO_DIRECTION:
+                break
+            dx, dy = planner.DIRECTIONS[code]
+            x, y = x + dx, y + dy
+        assert (x, y) == field.cell_of(goal)
+        arrived += 1
+    assert arrived > 80
+
+
+def test_only_clusters_on_the_route_are_built():
+    planner = HierarchicalPlanner(640, 480, cell_size=4, cluster_size=8)
+    field = planner.field_to((600, 450), OBSTACLES, margin=5.0)
+    assert field.built_clusters == []
+
+    route = field.route((20, 20))
+    assert route[0] == planner.cluster_of_cell(0)
+    assert route[-1] == planner.cluster_of_cell(112 * planner.grid_w + 150)
+    assert sorted(field.built_clusters) == sorted(route)
+    assert len(route) < planner.clusters_w * planner.clusters_h // 4
+
+    vector = field.get_vector((20, 20))
+    assert vector[0] > 0 and vector[1] > 0
+
+
+def test_portal_graph_is_built_once_per_layout():
+    planner = HierarchicalPlanner(320, 240, cell_size=4, cluster_size=8)
+    planner.field_to((300, 200), OBSTACLES, margin=5.0)
+    planner.field_to((20, 200), OBSTACLES, margin=5.0)
+    assert planner.builds == 1
+
+    planner.field_to((300, 200), OBSTACLES[1:], margin=5.0)
+    assert planner.builds == 2
+
+
+def test_portal_graph_is_keyed_by_layout():
+    planner = HierarchicalPlanner(320, 240, cell_size=4, cluster_size=8)
+    shaken = [CollisionShape((101, 100), 12)] + OBSTACLES[1:]
+    planner.field_to((300, 200), OBSTACLES, margin=5.0, layout="a")
+    planner.field_to((300, 200), shaken, margin=5.0, layout="a")
+    assert planner.builds == 1
+    planner.field_to((300, 200), OBSTACLES, margin=5.0, layout="b")
+    assert planner.builds == 2
+
+
+def test_blocked_goal_has_no_route():
+    planner = HierarchicalPlanner(320, 240, cell_size=4, cluster_size=8)
+    field = planner.field_to((100, 100), OBSTACLES, margin=5.0)
+    assert field.get_distance((20, 20)) == field.INF
+    assert field.get_vector((20, 20)) == (0.0, 0.0)
+
+
+def test_swarm_steers_with_planner():
+    pytest.importorskip('pygame')
+    from destructibles import Destructibles, Tree
+    from flag import NormalFlag
+    from flow_field_cache import FlowFieldCache
+    from flow_field_scheduler import FlowFieldScheduler
+    from stage import Stage
+    from swarm import Swarm
+
+    root = Stage()
+    destruct = Destructibles(200, 200, num_trees=0)
+    destruct.add_stage(Tree((100, 100), 10, owner=destruct))
+    root.destructibles = destruct
+    root.add_stage(destruct)
+    swarm = Swarm(
+        (255, 0, 0), 1, (255, 100, 100), width=200, height=200,
+        flow_field_cache=FlowFieldCache(),
+        flow_field_scheduler=FlowFieldScheduler(),
+        flow_field_planner=HierarchicalPlanner(200, 200, cell_size=4, cluster_size=8),
+    )
+    swarm.ants = [[20, 20]]
+    root.add_stage(swarm)
+    swarm.queue.add_flag_at((180, 180), NormalFlag)
+    swarm._update_flow_field()
+    swarm.flow_field_scheduler.join()
+
+    assert isinstance(swarm._flow_field, HierarchicalField)
+    assert swarm._flow_field_live_key.engine == "hierarchical"
+    vx, vy = swarm._flow_field.get_vector((20, 20))
+    assert vx > 0 and vy > 0
+
+    # A tree shaking from a hit does not change the layout
+    tree = destruct.trees[0]
+    tree.offset = (0.5, -0.5)
+    swarm._compute_flow_field(
+        (20, 180), swarm._get_obstacle_shapes(), layout=swarm._obstacle_layout()
+    )
+    assert swarm.flow_field_planner.builds == 1
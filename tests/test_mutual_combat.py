@@ -0,0 +1,100 @@
+import os
+import sys
+import random
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+pytest.importorskip('pygame')
+np = pytest.importorskip('numpy')
+
+from stage import Stage
+from player import Player
+from swarm import Swarm, ATTACK_RANGE, ARCHER_ATTACK_RANGE
+
+
+class Recorder(Stage):
+    def __init__(self):
+        super().__init__()
+        self.hits = []
+
+    def onCollision(self, stage):
+        self.hits.append(stage)
+
+
+def test_default_calls_both_handlers():
+    a, b = Recorder(), Recorder()
+    a.onMutualCollision(b)
+    assert a.hits == [b]
+    assert b.hits == [a]
+
+
+def _battle(mutual, vectorized):
+    random.seed(11)
+    rng = np.random.default_rng(11)
+    red, blue = Player(), Player()
+    red.enemies.append(blue)
+    blue.enemies.append(red)
+    root = Stage()
+    footmen = Swarm(
+        (255, 0, 0), 1, (255, 100, 100), width=200, height=200,
+        attack_range=ATTACK_RANGE, owner=red, vectorized=vectorized,
+    )
+    archers = Swarm(
+        (0, 0, 255), 2, (100, 100, 255), width=200, height=200,
+        attack_range=ARCHER_ATTACK_RANGE, owner=blue, vectorized=vectorized,
+    )
+    footmen.ants = rng.uniform(40, 110, size=(80, 2)).tolist()
+    archers.ants = rng.uniform(90, 160, size=(60, 2)).tolist()
+    for swarm in (footmen, archers):
+        swarm.kill_probability = 0.2
+        root.add_stage(swarm)
+    # Several rounds, so that attackers also keep remembered targets
+    for _ in range(3):
+        if mutual:
+            footmen.onMutualCollision(archers)
+        else:
+            footmen.onCollision(archers)
+            archers.onCollision(footmen)
+    return (
+        np.asarray(footmen.ants).tolist(),
+        np.asarray(archers.ants).tolist(),
+        footmen.engaged,
+        archers.engaged,
+        footmen.colliding_swarms == [archers] * 3,
+        archers.colliding_swarms == [footmen] * 3,
+    )
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_mutual_combat_matches_sequential_combat(vectorized):
+    expected = _battle(False, vectorized)
+    assert len(expected[0]) < 80 and len(expected[1]) < 60
+    assert _battle(True, vectorized) == expected
+
+
+def test_remembered_targets_skip_the_search(monkeypatch):
+    import swarm as swarm_module
+
+    searched = []
+    neighbor_pairs = swarm_module.neighbor_pairs
+
+    def counting(points, *args):
+        searched.append(len(points))
+        return neighbor_pairs(points, *args)
+
+    monkeypatch.setattr(swarm_module, "neighbor_pairs", counting)
+    a = Swarm((255, 0, 0), 1, (255, 100, 100), width=200, height=200)
+    b = Swarm((0, 0, 255), 2, (100, 100, 255), width=200, height=200)
+    a.ants = [[50, 50], [52, 50], [54, 50], [120, 120]]
+    b.ants = [[56, 50], [58, 50], [150, 150]]
+    for swarm in (a, b):
+        swarm.kill_probability = 0.0
+
+    a.onMutualCollision(b)
+    assert sum(searched) == len(a.ants) + len(b.ants)
+    del searched[:]
+    a.onMutualCollision(b)
+    # Only the units with nobody in range look again
+    assert sum(searched) == 2
+    assert a.engaged == {0, 1, 2} and b.engaged == {0, 1}
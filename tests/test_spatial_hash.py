@@ -0,0 +1,33 @@
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from spatial_hash import SpatialHash
+from swarm import Swarm
+
+
+def test_neighbors_contain_all_points_within_cell_size():
+    random.seed(1)
+    points = [(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(300)]
+    grid = SpatialHash(4, points)
+    assert len(grid) == len(points)
+    for x, y in points[:50]:
+        near = set(grid.neighbors(x, y))
+        for ox, oy in points:
+            if (x - ox) ** 2 + (y - oy) ** 2 < 16:
+                assert (ox, oy) in near
+
+
+def test_neighbors_skip_distant_points():
+    grid = SpatialHash(4, [(1, 1), (50, 50)])
+    assert grid.neighbors(2, 2) == [(1, 1)]
+
+
+def test_resolve_positions_uses_placed_neighbors():
+    swarm = Swarm((255, 0, 0), 1, (255, 100, 100), width=100, height=100)
+    ants = [[10, 10], [30, 30]]
+    proposed = [(20, 20), (21, 20)]
+    result = swarm._resolve_positions(ants, proposed)
+    assert result == [(20, 20), (30, 30)]
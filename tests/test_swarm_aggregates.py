@@ -0,0 +1,53 @@
+import os
+import sys
+import math
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from swarm import Swarm, compute_centroid
+
+
+def create_swarm(ants, vectorized=False):
+    swarm = Swarm(
+        (255, 0, 0), 1, (255, 100, 100), width=100, height=100, vectorized=vectorized
+    )
+    swarm.ants = [list(a) for a in ants]
+    return swarm
+
+
+def brute_spread(ants, center):
+    return max(math.hypot(x - center[0], y - center[1]) for x, y in ants)
+
+
+def test_aggregates_match_brute_force():
+    random.seed(4)
+    ants = [[random.uniform(0, 100), random.uniform(0, 100)] for _ in range(50)]
+    for vectorized in (False, True):
+        swarm = create_swarm(ants, vectorized)
+        center = compute_centroid(ants)
+        assert swarm.compute_centroid() == center
+        assert math.isclose(swarm.get_spread(), brute_spread(ants, center), rel_tol=1e-5)
+        bounds = swarm.get_bounds()
+        assert math.isclose(bounds[0], min(a[0] for a in ants), rel_tol=1e-5)
+        assert math.isclose(bounds[3], max(a[1] for a in ants), rel_tol=1e-5)
+
+
+def test_removal_updates_centroid_and_keeps_spread_enclosing():
+    random.seed(5)
+    ants = [[random.uniform(0, 100), random.uniform(0, 100)] for _ in range(40)]
+    for vectorized in (False, True):
+        swarm = create_swarm(ants, vectorized)
+        swarm.remove_ants([0, 3, 7, 20])
+        remaining = [a for i, a in enumerate(ants) if i not in (0, 3, 7, 20)]
+        center = compute_centroid(remaining)
+        assert swarm.compute_centroid() == center
+        assert swarm.get_spread() >= brute_spread(remaining, center) - 1e-4
+
+
+def test_direct_append_refreshes_aggregates():
+    swarm = create_swarm([[10, 10]])
+    assert swarm.getPosition() == (10, 10)
+    swarm.ants.append([30, 10])
+    assert swarm.getPosition() == (20, 10)
+    assert swarm.getCollisionShape().radius == 10 + swarm.attack_range
@@ -0,0 +1,57 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+pytest.importorskip('pygame')
+
+from stage import Stage
+from destructibles import Destructibles, Tree
+from flag import NormalFlag
+from flow_field_cache import FlowFieldCache
+from flow_field_scheduler import FlowFieldScheduler
+from swarm import Swarm
+
+
+def create_swarm():
+    root = Stage()
+    destruct = Destructibles(200, 100, num_trees=0)
+    destruct.add_stage(Tree((100, 20), 8, owner=destruct))
+    root.destructibles = destruct
+    root.add_stage(destruct)
+    swarm = Swarm(
+        (255, 0, 0), 1, (255, 100, 100), width=200, height=100,
+        flow_field_cache=FlowFieldCache(),
+        flow_field_scheduler=FlowFieldScheduler(),
+    )
+    swarm.ants = [[10, 18], [10, 22], [14, 20]]
+    root.add_stage(swarm)
+    return swarm
+
+
+def test_clear_path_skips_flow_field():
+    swarm = create_swarm()
+    swarm.queue.add_flag_at((190, 80), NormalFlag)
+    swarm._update_flow_field()
+    swarm.flow_field_scheduler.join()
+    assert swarm._flow_field is None
+    assert swarm.flow_field_scheduler.computed == 0
+
+
+def test_blocked_path_requests_flow_field():
+    swarm = create_swarm()
+    swarm.queue.add_flag_at((190, 20), NormalFlag)
+    swarm._update_flow_field()
+    swarm.flow_field_scheduler.join()
+    assert swarm._flow_field is not None
+
+
+def test_spread_is_part_of_the_test():
+    swarm = create_swarm()
+    # the centroid passes 15 px below the tree, but the units do not
+    swarm.ants = [[10, 25], [10, 45], [20, 35], [0, 35]]
+    swarm.queue.add_flag_at((190, 35), NormalFlag)
+    assert not swarm._path_is_clear(swarm.first_flag())
+    swarm.ants = [[10, 60], [10, 62]]
+    assert swarm._path_is_clear(swarm.first_flag())
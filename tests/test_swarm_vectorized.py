@@ -0,0 +1,71 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+np = pytest.importorskip('numpy')
+
+from stage import Stage
+from destructibles import Destructibles, Tree
+from flag import NormalFlag
+from spatial_hash import neighbor_pairs
+from swarm import Swarm, SwarmCannon
+
+
+def create_swarm(ants):
+    swarm = Swarm((255, 0, 0), 1, (255, 100, 100), width=100, height=100, vectorized=True)
+    swarm.ants = ants
+    swarm.show()
+    return swarm
+
+
+def test_positions_stored_as_float32_array():
+    swarm = create_swarm([[10, 20], [30, 40]])
+    assert isinstance(swarm.ants, np.ndarray)
+    assert swarm.ants.dtype == np.float32
+    assert swarm.ants.shape == (2, 2)
+    assert swarm.getPosition() == (20, 30)
+
+
+def test_vectorized_tick_moves_towards_flag():
+    np.random.seed(0)
+    swarm = create_swarm([[10, 50], [10, 60], [10, 70]])
+    swarm.queue.add_flag_at((90, 60), NormalFlag)
+    for _ in range(5):
+        swarm._tick(1.0)
+    assert (swarm.ants[:, 0] > 10).all()
+    assert swarm.ants.dtype == np.float32
+
+
+def test_vectorized_resolve_rejects_obstacles_and_crowding():
+    root = Stage()
+    destruct = Destructibles(100, 100, num_trees=0)
+    destruct.add_stage(Tree((20, 20), 5, owner=destruct))
+    root.destructibles = destruct
+    root.add_stage(destruct)
+    swarm = create_swarm([[10, 20], [50, 50], [60, 60]])
+    root.add_stage(swarm)
+
+    proposed = np.array([[20.0, 20.0], [55.0, 55.0], [56.0, 55.0]])
+    result = swarm._resolve_positions_array(swarm.ants, proposed)
+    assert result.tolist() == [[10, 20], [55, 55], [60, 60]]
+
+
+def test_remove_ants_keeps_cannon_orientations_aligned():
+    cannon = SwarmCannon((255, 0, 0), 3, (255, 100, 100), width=100, height=100, vectorized=True)
+    cannon.spawn(3, (0, 100), (0, 100), set())
+    cannon.orientations[:] = [0.0, 1.0, 2.0]
+    cannon.remove_ants([1])
+    assert len(cannon.ants) == 2
+    assert cannon.orientations.tolist() == [0.0, 2.0]
+
+
+def test_neighbor_pairs_cover_close_points():
+    rng = np.random.default_rng(3)
+    points = rng.uniform(0, 50, size=(200, 2))
+    i, j = neighbor_pairs(points, 4)
+    found = set(zip(i.tolist(), j.tolist()))
+    d2 = ((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=2)
+    for a, b in zip(*np.nonzero(d2 < 16)):
+        assert (a, b) in found